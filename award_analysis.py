@@ -1,9 +1,11 @@
 import streamlit as st
 import styles
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import re
+from awards_data import get_awards_handle, map_distinct, PERIOD_COLUMNS
+from datasets import HANDLE_HASH_FUNCS
+from tenants import TENANTS
+from awards_query import query_awards, count_awards
 
 # Award Color Palette
 AWARD_COLORS = {
@@ -19,68 +21,21 @@ ANALYSIS_AWARD_TYPES = [
     "Champion Award",
     "Awesome Award",
 ]
-TEAM_NORMALIZATION = {
-    "edgecore": "Edgecore",
-    "edge core": "Edgecore",
-    "greenmath": "Greenmath",
-    "greenmath team": "Greenmath",
-    "greenmath launch": "Greenmath Launch",
-    "greenmath  launch": "Greenmath Launch",
-    # add more variants here as needed
-}
-def normalize_name(name):
-    if pd.isna(name):
-        return name
-    name = str(name).strip().lower()
-    name = re.sub(r"\s+", " ", name)
-    name = re.sub(r"[^a-z\s]", "", name)
-    return name
-def canonical_team(name: str) -> str:
-    if not isinstance(name, str):
-        return ""
-    norm = normalize_name(name)
-    if norm in TEAM_NORMALIZATION:
-        return TEAM_NORMALIZATION[norm]
-    return name.strip().title()
-def is_unknown_team(name) -> bool:
-    if pd.isna(name): return True
-    s = str(name).strip().lower()
-    if not s: return True
-    if s in {"nan", "none", "-", "unknown", "unknown team", "unknown team name", "unassigned"}:
-        return True
-    s_clean = re.sub(r"[^a-z]", " ", s)
-    tokens = s_clean.split()
-    if "unknown" in tokens: return True
-    if s.startswith("unknown"): return True
-    return False
-def map_sankey_bucket(title: str) -> str | None:
-    if not isinstance(title, str):
-        return None
-    t = title.lower().strip()
-    if "team" in t and "spot" not in t and "ota" not in t and "occasion" not in t:
-        return "Team Award"
-    if "spot" in t:
-        return "Spot Award"
-    if "ota" in t or "one time" in t or "one-time" in t:
-        return "OTA"
-    return None
-@st.cache_data
+def _award_title(title) -> str:
+    return str(title).title().strip()
+
 def load_data():
-    sheet_key = "1xVpXomZBOyIeyvpyDjXQlSEIfU35v6j0jkhdaETm4-Q"
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_key}/export?format=csv"
-    df = pd.read_csv(url)
-    df["Month"] = df["Month"].astype(str).str.strip().str.capitalize()
-    df["year"] = pd.to_numeric(df["year"], errors="coerce")
-    month_map = {m: i+1 for i, m in enumerate([
-        "January","February","March","April","May","June","July","August",
-        "September","October","November","December"
-    ])}
-    df["Month_Num"] = df["Month"].map(month_map)
-    df["Date"] = pd.to_datetime(
-        dict(year=df["year"], month=df["Month_Num"], day=1), errors="coerce",
-    )
-    df["New_Award_title"] = df["New_Award_title"].astype(str).str.title().str.strip()
-    df["Team name"] = df["Team name"].astype(str).apply(canonical_team)
+    return _prepare_data(get_awards_handle())
+
+@st.cache_resource(max_entries=2 * len(TENANTS), hash_funcs=HANDLE_HASH_FUNCS)
+def _prepare_data(handle):
+    # Keyed on the dataset handle: re-runs only when the data changes.
+    # cache_resource hands every session the same frame (cache_data would
+    # unpickle a private copy per rerun), so callers must not modify it.
+    df = handle.frame()
+    # Dates, periods, canonical teams and Sankey buckets come from the loader
+    df["New_Award_title"] = map_distinct(df["New_Award_title"], _award_title, as_category=True)
+    df["Team name"] = df["Team_Canonical"]
     return df
 
 def show_award_analysis():
@@ -128,57 +83,53 @@ def show_award_analysis():
         "Select Team(s)", options=team_options, default=["All"]
     )
 
-    # Recognition System selector
-    recognition_systems = sorted(df["Nominated In"].dropna().unique())
-    rec_options = ["All"] + recognition_systems
-    selected_sys = st.multiselect("Recognition System", rec_options, default=["All"])
+    # Recognition System selector ("Nominated In" and "Award Title" are
+    # optional in the export; what needs them is left out without them)
+    has_systems = "Nominated In" in df.columns
+    has_titles = "Award Title" in df.columns
+    selected_sys = ["All"]
+    if has_systems:
+        recognition_systems = sorted(df["Nominated In"].dropna().unique())
+        rec_options = ["All"] + recognition_systems
+        selected_sys = st.multiselect("Recognition System", rec_options, default=["All"])
 
     # ========= APPLY FILTERS =========
-    df_filtered = df[
-        (df["year"].isin(selected_years))
-        & (df["New_Award_title"].isin(award_types))
-    ].copy()
-
+    # Charts run filtered aggregations through query_awards instead of
+    # materialising a filtered copy of the frame.
+    where = {"year": selected_years, "New_Award_title": award_types}
     if "All" not in selected_sys:
-        df_filtered = df_filtered[df_filtered["Nominated In"].isin(selected_sys)]
+        where["Nominated In"] = selected_sys
     if "All" not in selected_teams:
-        df_filtered = df_filtered[df_filtered["Team name"].isin(selected_teams)]
-
-    if period == "Monthly":
-        df_filtered["Period"] = df_filtered["Date"].dt.to_period("M").dt.to_timestamp()
-    elif period == "Quarterly":
-        df_filtered["Period"] = (
-            df_filtered["Date"].dt.to_period("Q").dt.to_timestamp()
-        )
-    else:
-        df_filtered["Period"] = df_filtered["Date"].dt.to_period("Y").dt.to_timestamp()
+        where["Team name"] = selected_teams
+    known_teams = {**where, "Team_Unknown": [False]}
+    period_col = PERIOD_COLUMNS[period]
 
     st.divider()
 
-    if df_filtered.empty:
+    total_awards = count_awards(df, where)
+    if total_awards == 0:
         st.info("No data available for the current filters.")
         return
 
     # ========= KPIs =========
-    total_awards = len(df_filtered)
-    old_title_count = df[df["Nominated In"].str.lower() == "all-hands"]["Award Title"].nunique()
+    if has_systems and has_titles:
+        old_title_count = df[df["Nominated In"].str.lower() == "all-hands"]["Award Title"].nunique()
+    else:
+        old_title_count = "—"
     new_title_count = len(ANALYSIS_AWARD_TYPES)
 
     # Top team (exclude unknowns)
-    team_awards_only = df_filtered[
-        (df_filtered["New_Award_title"] == "Team Award")
-        & (~df_filtered["Team name"].apply(is_unknown_team))
-    ]
-    if not team_awards_only.empty:
-        top_team = team_awards_only["Team name"].value_counts().idxmax()
+    team_award_counts = query_awards(
+        df, by=["Team name"],
+        where={**known_teams, "New_Award_title": [t for t in award_types if t == "Team Award"]},
+    )
+    if not team_award_counts.empty:
+        top_team = team_award_counts.loc[team_award_counts["Count"].idxmax(), "Team name"]
     else:
         top_team = "—"
 
-    most_common_award = (
-        df_filtered["New_Award_title"].value_counts().idxmax()
-        if not df_filtered.empty
-        else "—"
-    )
+    award_counts = query_awards(df, by=["New_Award_title"], where=where)
+    most_common_award = award_counts.loc[award_counts["Count"].idxmax(), "New_Award_title"]
 
     kpi1, kpi2, kpi3, kpi4 = st.columns(4)
     with kpi1:
@@ -262,18 +213,16 @@ def show_award_analysis():
             df_for_sankey["Team name"].isin(selected_teams)
         ]
 
-    df_for_sankey["Sankey_Target"] = df_for_sankey["New_Award_title"].apply(
-        map_sankey_bucket
-    )
     df_for_sankey = df_for_sankey.dropna(subset=["Sankey_Target"])
     sankey_targets = sorted(df_for_sankey["Sankey_Target"].unique())
 
     def clean_team_list(series):
         unique = {t.strip() for t in series.astype(str)}
-        unique = {t for t in unique if not is_unknown_team(t)}
         return ", ".join(sorted(unique)) if unique else "No team info"
 
-    if not sankey_targets:
+    if not has_titles:
+        st.info("The awards export has no Award Title column to map from.")
+    elif not sankey_targets:
         st.info("No Sankey targets (Team / Spot / OTA) in current filters.")
     else:
         tabs = st.tabs(sankey_targets)
@@ -286,13 +235,14 @@ def show_award_analysis():
                     st.info("No data available for this bucket in the current filters.")
                     continue
                 sankey_group = (
-                    sankey_df.groupby(["Award Title", "Sankey_Target"])
+                    sankey_df.groupby(["Award Title", "Sankey_Target"], observed=True)
                     .size()
                     .reset_index(name="Count")
                 )
                 team_names_by_title = (
-                    sankey_df.dropna(subset=["Award Title", "Team name"])
-                    .groupby("Award Title")["Team name"]
+                    sankey_df[~sankey_df["Team_Unknown"]]
+                    .dropna(subset=["Award Title", "Team name"])
+                    .groupby("Award Title", observed=True)["Team name"]
                     .apply(clean_team_list)
                     .to_dict()
                 )
@@ -348,7 +298,7 @@ def show_award_analysis():
         "<p class='section-title'>Most Frequently Given Awards</p>",
         unsafe_allow_html=True,
     )
-    top_awards = df_filtered["New_Award_title"].value_counts().reset_index()
+    top_awards = award_counts.sort_values("Count", ascending=False, kind="stable")
     top_awards.columns = ["Award Title", "Count"]
     fig1 = px.bar(
         top_awards,
@@ -369,11 +319,11 @@ def show_award_analysis():
         unsafe_allow_html=True,
     )
     team_awards = (
-        df_filtered.groupby(["New_Award_title", "Team name"])
-        .size()
-        .reset_index(name="Award Count")
+        query_awards(df, by=["New_Award_title", "Team name"], where=known_teams,
+                     measures={"Award Count": (None, "size")})
+        # plotly's treemap path needs plain labels, not categoricals
+        .astype({"New_Award_title": str, "Team name": str})
     )
-    team_awards = team_awards[~team_awards["Team name"].apply(is_unknown_team)]
     if not team_awards.empty:
         fig2 = px.treemap(
             team_awards,
@@ -393,14 +343,12 @@ def show_award_analysis():
         "<p class='section-title'>Top Award-Winning Teams</p>",
         unsafe_allow_html=True,
     )
-    df_leader = df_filtered[~df_filtered["Team name"].apply(is_unknown_team)].copy()
-    leaderboard = (
-        df_leader.groupby("Team name")
-        .agg(
-            People_Count=("Employee Name", "nunique"),
-            Award_Count=("New_Award_title", "count"),
-        )
-        .reset_index()
+    leaderboard = query_awards(
+        df, by=["Team name"], where=known_teams,
+        measures={
+            "People_Count": ("Employee Name", "nunique"),
+            "Award_Count": ("New_Award_title", "count"),
+        },
     )
     leaderboard["Recognition_Score"] = (
         (leaderboard["People_Count"] * 0.6)
@@ -449,11 +397,10 @@ def show_award_analysis():
         "<p class='section-title'>Award Growth Over Time</p>",
         unsafe_allow_html=True,
     )
-    timeline = (
-        df_filtered.groupby(["Period", "New_Award_title"])
-        .size()
-        .reset_index(name="Award Count")
-    )
+    timeline = query_awards(
+        df, by=[period_col, "New_Award_title"], where=where,
+        measures={"Award Count": (None, "size")},
+    ).rename(columns={period_col: "Period"})
     if timeline.empty:
         st.info("No timeline data available for the current filters.")
     else:
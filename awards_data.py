@@ -0,0 +1,361 @@
+import re
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data_sources import read_source, read_source_chunks, forget_source_validators, CHUNK_ROWS, SourceSchema
+from datasets import (
+    register_dataset, get_dataset, get_handle, DatasetHandle, HANDLE_HASH_FUNCS, dataset_changes,
+)
+from snapshot_store import stream_to_snapshot
+from ingest import incremental_ingest
+from awards_store import write_store
+from entity_resolution import resolve_alias, update_alias_table, alias_digest
+from tenants import current_tenant, TENANTS
+
+# ---------------------------------------------------------
+# 🏅 SHARED AWARDS DATASET
+# ---------------------------------------------------------
+# The awards sheet feeds Award Analysis, Recognition (Team and
+# Individual) and Coupon Estimation. It is fetched and parsed once per
+# process and every page receives its own read-only view of it. Where
+# the rows come from is configured in ``data_sources``; the parsed frame
+# is also kept as an on-disk snapshot so restarts skip the download, and
+# ``datasets`` refreshes it in the background.
+
+
+MONTH_NUMBERS = {m: i + 1 for i, m in enumerate([
+    "January", "February", "March", "April", "May", "June", "July", "August",
+    "September", "October", "November", "December"
+])}
+# Full names, three-letter abbreviations and numbers, all lower case
+_MONTH_LOOKUP = {
+    **{m.lower(): n for m, n in MONTH_NUMBERS.items()},
+    **{m[:3].lower(): n for m, n in MONTH_NUMBERS.items()},
+    **{str(n): n for n in MONTH_NUMBERS.values()},
+    **{f"{n:02d}": n for n in MONTH_NUMBERS.values()},
+    **{f"{n}.0": n for n in MONTH_NUMBERS.values()},
+}
+
+# One table for every page. Keys are team names after ``team_key``.
+# Spelling variants found later are listed in the alias table that
+# ``entity_resolution`` maintains; this table is for the ones it cannot
+# guess (e.g. "greenmath team").
+TEAM_NORMALIZATION = {
+    "edgecore": "Edgecore",
+    "edge core": "Edgecore",
+    "edgecre": "Edgecore",
+    "greenmath": "Greenmath",
+    "greenmath team": "Greenmath",
+    "greenmath launch": "Greenmath Launch",
+    "pr greenmath launch": "PR - Greenmath Launch",
+    # add more variants here as needed
+}
+UNKNOWN_TEAM_NAMES = {
+    "nan", "none", "null", "-", "unknown", "unknown team", "unknown team name", "unassigned",
+}
+
+PERIOD_COLUMNS = {"Monthly": "Period_M", "Quarterly": "Period_Q", "Yearly": "Period_Y"}
+AMOUNT_CANDIDATES = [
+    "Coupon Amount", "Coupon Amount (₹)", "Coupon amount",
+    "Coupon", "Amount", "Budget", "Allocation",
+    "Award Amount", "Award_Value", "CouponValue", "Coupon_Value",
+]
+NOMINATED_CANDIDATES = ["Nominated", "Nominated In", "NominatedIn"]
+# The export columns the pages use; nothing else is parsed. Amount and
+# nominated-in columns go by several names and are matched by keyword.
+AWARDS_SCHEMA = SourceSchema(
+    required=["year", "Month", "Team name", "Employee Name", "New_Award_title"],
+    optional=["Award Title", "Nominated In", "Award Date"],
+    keywords=["coupon", "amount", "allocation", "budget", "award_value", "nominated"],
+    dtypes={col: "category" for col in [
+        "Month", "Team name", "Employee Name", "New_Award_title", "Award Title", "Nominated In",
+    ]},
+    numeric=["year"],
+)
+SYSTEM_ALL_HANDS = "All Hands"
+SYSTEM_KUDOS = "Kudos Corner"
+# An award is one person's nomination for one month; a refresh that
+# changes any other value of such a row reports it as edited.
+AWARD_KEY_COLUMNS = ["Employee Name", "year", "Month"]
+
+
+def team_key(name) -> str:
+    """Lower-case letters only, single-spaced: the lookup key for teams."""
+    return " ".join(re.sub(r"[^a-z]", " ", str(name).lower()).split())
+
+
+def canonical_team(name: str) -> str:
+    if not isinstance(name, str):
+        return ""
+    return resolve_alias("team", TEAM_NORMALIZATION.get(team_key(name), name.strip().title()))
+
+
+def canonical_employee(name):
+    return resolve_alias("employee", name)
+
+
+def is_unknown_team(name) -> bool:
+    if pd.isna(name):
+        return True
+    s = str(name).strip().lower()
+    return not s or s in UNKNOWN_TEAM_NAMES or "unknown" in s
+
+
+def map_sankey_bucket(title: str) -> str | None:
+    if not isinstance(title, str):
+        return None
+    t = title.lower().strip()
+    if "team" in t and "spot" not in t and "ota" not in t and "occasion" not in t:
+        return "Team Award"
+    if "spot" in t:
+        return "Spot Award"
+    if "ota" in t or "one time" in t or "one-time" in t:
+        return "OTA"
+    return None
+
+
+def find_amount_column(df: pd.DataFrame) -> str | None:
+    lower_cols = {c.lower(): c for c in df.columns}
+    for cand in AMOUNT_CANDIDATES:
+        if cand.lower() in lower_cols:
+            return lower_cols[cand.lower()]
+    for c in df.columns:
+        lc = c.lower()
+        if any(k in lc for k in ["coupon", "amount", "allocation", "budget"]):
+            return c
+    return None
+
+
+def parse_amount(series: pd.Series) -> pd.Series:
+    """First number in each cell (rupee signs and thousands commas ignored), 0 if none."""
+    s = series.astype(str).str.replace("\u20b9", "", regex=False).str.replace(",", "", regex=False)
+    extracted = s.str.strip().str.extract(r"(-?\d+(?:\.\d+)?)", expand=False)
+    return pd.to_numeric(extracted, errors="coerce").fillna(0.0)
+
+
+# -----------------------
+# Distinct-value normalisers
+# -----------------------
+# A column holds a few hundred distinct team names or titles however
+# many rows it has, so each normaliser runs once per distinct value and
+# the result is broadcast back through the factorised codes. Results
+# are also memoised per function (and tenant, whose alias tables differ)
+# for the life of the process, so a refresh only evaluates values it has
+# not seen before.
+_normaliser_memo: dict = {}
+
+
+def map_distinct(series: pd.Series, fn, as_category: bool = False) -> pd.Series:
+    """``series.apply(fn)`` evaluated once per distinct value.
+
+    ``fn`` should be a module-level function (it is the memo key). With
+    ``as_category`` the result is a categorical, otherwise it takes the
+    natural dtype of ``fn``'s results (e.g. bool for a predicate).
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    memo = _normaliser_memo.setdefault((fn, current_tenant()), {})
+    values = []
+    for value in uniques:
+        key = None if pd.isna(value) else value
+        if key not in memo:
+            memo[key] = fn(value)
+        values.append(memo[key])
+    if as_category:
+        out_codes, categories = pd.factorize(pd.Series(values, dtype=object), sort=True)
+        return pd.Series(
+            pd.Categorical.from_codes(out_codes[codes], categories=categories),
+            index=series.index,
+        )
+    return pd.Series(np.asarray(values)[codes], index=series.index)
+
+
+def clear_normaliser_cache():
+    """Forget memoised results (after editing a mapping table at runtime)."""
+    _normaliser_memo.clear()
+
+
+# -----------------------
+# Row cleaning
+# -----------------------
+# Every derived column the pages use is computed here, once, at load
+# time. The step is row-local so incremental ingestion can run it on new
+# rows only.
+DERIVED_COLUMNS = [
+    "Month_Num", "Date", "Period_M", "Period_Q", "Period_Y",
+    "Team_Canonical", "Team_Unknown", "Sankey_Target", "System", "Amount",
+]
+
+
+def _month_numbers(df: pd.DataFrame) -> pd.Series:
+    """Month number from full names, abbreviations or numbers (any case)."""
+    return df["Month"].astype(str).str.strip().str.lower().map(_MONTH_LOOKUP)
+
+
+def award_period_key(df: pd.DataFrame) -> pd.Series:
+    """``year * 100 + month`` per row (-1 when either part is missing)."""
+    # Stored years are Int16, which ``year * 100`` would overflow
+    year = pd.to_numeric(df["year"], errors="coerce").astype("float64")
+    return (year * 100 + _month_numbers(df)).fillna(-1)
+
+
+def _system(df: pd.DataFrame) -> pd.Series:
+    """"Kudos Corner", "All Hands" or missing, from the nominated-in column."""
+    nom_col = next((c for c in NOMINATED_CANDIDATES if c in df.columns), None)
+    if nom_col:
+        nom = df[nom_col].astype(str)
+        kudos = nom.str.contains("kudos", case=False, na=False)
+        all_hands = nom.str.contains("all", case=False, na=False) & ~kudos
+    else:
+        kudos = df.astype(str).apply(lambda c: c.str.contains("kudos", case=False)).any(axis=1)
+        all_hands = pd.Series(False, index=df.index)
+    system = pd.Series(None, index=df.index, dtype=object)
+    system[all_hands] = SYSTEM_ALL_HANDS
+    system[kudos] = SYSTEM_KUDOS
+    return system
+
+
+def clean_award_rows(raw: pd.DataFrame) -> pd.DataFrame:
+    """Add the derived columns to raw award rows.
+
+    Row-local, so it can run on just the rows that are new since the
+    last refresh. The raw columns are left as exported, except that
+    employee names are resolved through the alias table.
+    """
+    df = raw.copy()
+    df["Employee Name"] = map_distinct(df["Employee Name"], canonical_employee, as_category=True)
+    df["Month_Num"] = _month_numbers(df)
+    df["Date"] = pd.to_datetime(
+        dict(year=pd.to_numeric(df["year"], errors="coerce"), month=df["Month_Num"], day=1),
+        errors="coerce",
+    )
+    for freq, col in zip("MQY", PERIOD_COLUMNS.values()):
+        df[col] = df["Date"].dt.to_period(freq).dt.to_timestamp()
+    df["Team_Canonical"] = map_distinct(df["Team name"], canonical_team, as_category=True)
+    df["Team_Unknown"] = map_distinct(df["Team_Canonical"], is_unknown_team).astype(bool)
+    df["Sankey_Target"] = map_distinct(df["New_Award_title"], map_sankey_bucket, as_category=True)
+    df["System"] = _system(raw)
+    amt_col = find_amount_column(raw)
+    df["Amount"] = parse_amount(df[amt_col]) if amt_col else 0.0
+    return df
+
+
+# -----------------------
+# Compact column types
+# -----------------------
+# Repeated text columns become categoricals (filters, groupbys and
+# value counts then run on small integer codes), year and month become
+# nullable 16-bit integers, and Date is a plain datetime64 column.
+CATEGORY_COLUMNS = [
+    "Team name", "New_Award_title", "Award Title", "Nominated In",
+    "Employee Name", "Month", "Team_Canonical", "Sankey_Target", "System",
+]
+SMALL_INT_COLUMNS = ["year", "Month_Num"]
+
+
+def compact_awards(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy(deep=False)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in SMALL_INT_COLUMNS:
+        if col in df.columns and df[col].dtype != "Int16":
+            df[col] = pd.to_numeric(df[col], errors="coerce").round().astype("Int16")
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    return df
+
+
+def fill_category(series: pd.Series, value) -> pd.Series:
+    """``fillna`` that also works when ``value`` is not yet a category."""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-column dtype and deep memory use, largest first."""
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        "Column": usage.index,
+        "Dtype": [str(df[c].dtype) for c in usage.index],
+        "Bytes": usage.to_numpy(),
+    }).sort_values("Bytes", ascending=False, ignore_index=True)
+    report["MB"] = (report["Bytes"] / 1_048_576).round(3)
+    return report
+
+
+@st.cache_data(max_entries=2 * len(TENANTS), hash_funcs=HANDLE_HASH_FUNCS, show_spinner=False)
+def awards_memory_report(handle: DatasetHandle) -> pd.DataFrame:
+    """``memory_report`` of one awards version, measured once per version."""
+    return memory_report(handle.frame())
+
+
+def _clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    return compact_awards(clean_award_rows(chunk))
+
+
+_applied: dict = {}
+
+
+def fetch_awards_data(previous: pd.DataFrame | None = None) -> pd.DataFrame:
+    tenant, aliases = current_tenant(), alias_digest()
+    if _applied.get(tenant) != aliases:
+        # Stored rows were resolved with other aliases (or, on the first
+        # refresh after a start, with unknown ones): re-clean them all,
+        # even if the export itself has not changed
+        clear_normaliser_cache()
+        forget_source_validators("awards")
+        previous = None
+    if CHUNK_ROWS:
+        # Streaming mode: bounded memory, but every refresh is a full rebuild
+        df = stream_to_snapshot(
+            "awards", read_source_chunks("awards", schema=AWARDS_SCHEMA), _clean_chunk
+        )
+    else:
+        raw = read_source("awards", schema=AWARDS_SCHEMA)
+        if previous is not None and not set(DERIVED_COLUMNS) <= set(previous.columns):
+            previous = None  # stored before a derived column existed: rebuild all rows
+        df = compact_awards(
+            incremental_ingest(previous, raw, clean_award_rows, award_period_key)
+        )
+    # Only a frame that was actually rebuilt carries the new aliases
+    _applied[tenant] = aliases
+    return df
+
+
+def suggest_award_aliases(df: pd.DataFrame, meta: dict | None = None):
+    """Add alias suggestions for the team and employee names in ``df``."""
+    known = df[~df["Team_Unknown"]] if "Team_Unknown" in df.columns else df
+    update_alias_table("team", known["Team_Canonical"].value_counts())
+    update_alias_table("employee", df["Employee Name"].value_counts())
+
+
+register_dataset(
+    "awards", fetch_awards_data, on_update=[write_store, suggest_award_aliases],
+    key_columns=AWARD_KEY_COLUMNS,
+)
+
+
+def get_awards() -> pd.DataFrame:
+    """Return a read-only view of the shared awards frame.
+
+    The view shares its data with the cached frame, so pages must not
+    modify it in place. Assigning a column or filtering rows creates a
+    new frame and leaves the shared copy untouched.
+    """
+    return get_dataset("awards")[0].copy(deep=False)
+
+
+def get_awards_meta() -> dict:
+    """Snapshot metadata (content hash, row count, timestamps)."""
+    return get_dataset("awards")[1]
+
+
+def get_awards_handle() -> DatasetHandle:
+    """Handle on the current awards version, for cached builders."""
+    return get_handle("awards")
+
+
+def get_awards_changes() -> tuple[pd.DataFrame, dict] | None:
+    """Awards added, edited and removed by the last refresh (see ``dataset_changes``)."""
+    return dataset_changes("awards")
@@ -0,0 +1,322 @@
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+import pandas as pd
+import awards_data  # registers the "awards" dataset
+import awards_store
+from datasets import get_dataset
+
+log = logging.getLogger(__name__)
+
+# Optional DuckDB engine
+try:
+    import duckdb
+    DUCKDB_OK = True
+except Exception:
+    DUCKDB_OK = False
+
+# Optional Polars engine
+try:
+    import polars as pl
+    POLARS_OK = True
+except Exception:
+    POLARS_OK = False
+
+# ---------------------------------------------------------
+# 🦆 FILTER + AGGREGATE QUERIES OVER THE AWARDS FRAME
+# ---------------------------------------------------------
+# Charts describe what they need as "group by these columns, keep rows
+# whose columns are in these value lists, compute these measures". With
+# DuckDB installed the request is compiled into one SQL statement that
+# scans the frame in place (no masked copy), filters and aggregates in a
+# single multi-threaded pass and hands back only the small result.
+# Polars runs the same request as one optimised lazy query, also on all
+# cores. The pandas path computes exactly the same frame, so pages do
+# not care which engine ran.
+#
+#   RR_QUERY_ENGINE=auto    DuckDB when installed, else pandas (default)
+#   RR_QUERY_ENGINE=pandas  always pandas
+#   RR_QUERY_ENGINE=duckdb  DuckDB (falls back to pandas if not installed)
+#   RR_QUERY_ENGINE=polars  Polars lazy queries (falls back to pandas if not installed)
+QUERY_ENGINE = os.environ.get("RR_QUERY_ENGINE", "auto").strip().lower()
+
+# measure name -> (column, aggregation); "size" ignores the column
+SQL_AGGREGATES = {
+    "size": "COUNT(*)",
+    "count": "COUNT({col})",
+    "nunique": "COUNT(DISTINCT {col})",
+    "sum": "COALESCE(SUM({col}), 0)",
+    "min": "MIN({col})",
+    "max": "MAX({col})",
+    "mean": "AVG({col})",
+}
+# The same over a summary table, where each row stands for {n} awards
+WEIGHTED_AGGREGATES = {
+    "size": "SUM({n})",
+    "count": "SUM(CASE WHEN {col} IS NOT NULL THEN {n} ELSE 0 END)",
+    "nunique": "COUNT(DISTINCT {col})",
+    "sum": "COALESCE(SUM({col} * {n}), 0)",
+    "min": "MIN({col})",
+    "max": "MAX({col})",
+    "mean": "SUM({col} * {n}) * 1.0 / SUM(CASE WHEN {col} IS NOT NULL THEN {n} END)",
+}
+COUNT_AGGREGATES = ("size", "count", "nunique")
+DEFAULT_MEASURES = {"Count": (None, "size")}
+
+_local = threading.local()
+
+
+def use_duckdb() -> bool:
+    return DUCKDB_OK and QUERY_ENGINE in ("auto", "duckdb")
+
+
+def use_polars() -> bool:
+    return POLARS_OK and QUERY_ENGINE == "polars"
+
+
+def _quote(col: str) -> str:
+    return '"' + str(col).replace('"', '""') + '"'
+
+
+def _values(values) -> list:
+    return [v.item() if hasattr(v, "item") else v for v in values]
+
+
+# -----------------------
+# pandas engine
+# -----------------------
+def _mask(df: pd.DataFrame, where: dict, where_not: dict) -> pd.Series:
+    mask = pd.Series(True, index=df.index)
+    for col, values in where.items():
+        mask &= df[col].isin(list(values))
+    for col, values in where_not.items():
+        mask &= ~df[col].isin(list(values))
+    return mask
+
+
+def _column_names(by, measures, where, where_not) -> set:
+    return set(by) | set(where) | set(where_not) | {c for c, _ in measures.values() if c}
+
+
+def _used_columns(df, by, measures, where, where_not) -> pd.DataFrame:
+    """The columns a query touches, as a frame sharing ``df``'s data."""
+    cols = _column_names(by, measures, where, where_not)
+    return pd.DataFrame({c: df[c] for c in df.columns if c in cols}, index=df.index, copy=False)
+
+
+def _query_pandas(df, by, measures, where, where_not, dropna=True) -> pd.DataFrame:
+    sub = _used_columns(df, by, measures, where, where_not)
+    if where or where_not:
+        sub = sub[_mask(sub, where, where_not)]
+    if not by:
+        row = {}
+        for name, (col, agg) in measures.items():
+            row[name] = len(sub) if agg == "size" else sub[col].agg(agg)
+        return pd.DataFrame([row])
+    first = by[0]
+    named = {name: (col or first, agg) for name, (col, agg) in measures.items()}
+    return sub.groupby(by, observed=True, dropna=dropna).agg(**named).reset_index()
+
+
+# -----------------------
+# DuckDB engine
+# -----------------------
+def _connection():
+    con = getattr(_local, "con", None)
+    if con is None:
+        con = duckdb.connect()
+        _local.con = con
+    return con
+
+
+def _in_list(col: str, values: list, dialect: str) -> tuple[str, list]:
+    if dialect == "duckdb":
+        return f"list_contains(?, {_quote(col)})", [values]
+    return f"{_quote(col)} IN ({', '.join('?' * len(values))})", values
+
+
+def compile_sql(by, measures, where, where_not, table="awards", dialect="duckdb",
+                weight=None, dropna=True) -> tuple[str, list]:
+    """SQL text and parameters for a query against ``table``.
+
+    ``dialect`` is "duckdb" or "sqlite". With ``weight`` each row of
+    ``table`` counts as that many awards (a summary table).
+    """
+    aggregates = WEIGHTED_AGGREGATES if weight else SQL_AGGREGATES
+    select = [_quote(c) for c in by]
+    for name, (col, agg) in measures.items():
+        expr = aggregates[agg].format(col=_quote(col) if col else "*", n=_quote(weight or ""))
+        select.append(f"{expr} AS {_quote(name)}")
+
+    conds, params = [], []
+    for col, values in where.items():
+        cond, args = _in_list(col, _values(values), dialect)
+        conds.append(cond)
+        params += args
+    for col, values in where_not.items():
+        # pandas keeps missing values under ~isin, SQL would drop them
+        cond, args = _in_list(col, _values(values), dialect)
+        conds.append(f"({_quote(col)} IS NULL OR NOT {cond})")
+        params += args
+    if dropna:
+        # pandas leaves rows with a missing group key out of the groups
+        conds += [f"{_quote(c)} IS NOT NULL" for c in by]
+
+    sql = f"SELECT {', '.join(select)} FROM {_quote(table)}"
+    if conds:
+        sql += " WHERE " + " AND ".join(conds)
+    if by:
+        keys = ", ".join(_quote(c) for c in by)
+        order = ", ".join(f"{_quote(c)} NULLS LAST" for c in by)
+        sql += f" GROUP BY {keys} ORDER BY {order}"
+    return sql, params
+
+
+def _match_types(out: pd.DataFrame, df: pd.DataFrame, by, measures) -> pd.DataFrame:
+    """Give SQL results the dtypes the pandas path produces."""
+    for col in by:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            out[col] = pd.Categorical(out[col], categories=dtype.categories, ordered=dtype.ordered)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            out[col] = pd.to_datetime(out[col])
+        elif pd.api.types.is_bool_dtype(dtype):
+            out[col] = out[col].astype(bool)
+        elif out[col].dtype != dtype:
+            out[col] = out[col].astype(dtype)
+    for name, (_, agg) in measures.items():
+        if agg in COUNT_AGGREGATES:
+            out[name] = pd.to_numeric(out[name]).fillna(0).astype("int64")
+    return out
+
+
+def _query_duckdb(df, by, measures, where, where_not, dropna=True) -> pd.DataFrame:
+    sql, params = compile_sql(by, measures, where, where_not, dropna=dropna)
+    con = _connection()
+    # Registering only the used columns keeps DuckDB from sniffing the
+    # types of every text column in the frame
+    con.register("awards", _used_columns(df, by, measures, where, where_not))
+    try:
+        out = con.execute(sql, params).df()
+    finally:
+        con.unregister("awards")
+    return _match_types(out, df, by, measures)
+
+
+# -----------------------
+# Polars engine
+# -----------------------
+# Categorical columns enter Polars as their integer codes: filters then
+# compare small integers, and groups sort in category order, as pandas
+# sorts them.
+POLARS_AGGREGATES = {
+    "size": lambda col: pl.len(),
+    "count": lambda col: pl.col(col).count(),
+    "nunique": lambda col: pl.col(col).drop_nulls().n_unique(),
+    "sum": lambda col: pl.col(col).sum(),
+    "min": lambda col: pl.col(col).min(),
+    "max": lambda col: pl.col(col).max(),
+    "mean": lambda col: pl.col(col).mean(),
+}
+
+
+def _polars_series(s: pd.Series):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = pl.Series(s.name, s.cat.codes.to_numpy())
+        return pl.select(pl.when(codes >= 0).then(codes).alias(s.name)).to_series()
+    return pl.from_pandas(s)
+
+
+def _polars_isin(sub: pd.DataFrame, col: str, values):
+    dtype = sub[col].dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        values = [int(i) for i in dtype.categories.get_indexer(list(values)) if i >= 0]
+    return pl.col(col).is_in(_values(values)).fill_null(False)
+
+
+def _query_polars(df, by, measures, where, where_not, dropna=True) -> pd.DataFrame:
+    sub = _used_columns(df, by, measures, where, where_not)
+    frame = pl.DataFrame([_polars_series(sub[c]) for c in sub.columns]).lazy()
+    conds = [_polars_isin(sub, c, v) for c, v in where.items()]
+    conds += [~_polars_isin(sub, c, v) for c, v in where_not.items()]
+    if dropna:
+        conds += [pl.col(c).is_not_null() for c in by]
+    if conds:
+        frame = frame.filter(pl.all_horizontal(conds))
+    aggs = [POLARS_AGGREGATES[agg](col).alias(name) for name, (col, agg) in measures.items()]
+    if by:
+        frame = frame.group_by(by).agg(aggs).sort(by, nulls_last=True)
+    else:
+        frame = frame.select(aggs)
+    out = frame.collect().to_pandas()
+    for col in by:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            out[col] = pd.Categorical.from_codes(out[col].fillna(-1).astype(int), dtype=dtype)
+    return _match_types(out, df, by, measures)
+
+
+# -----------------------
+# SQLite store
+# -----------------------
+def _query_sqlite(df, by, measures, where, where_not, dropna=True) -> pd.DataFrame:
+    table = awards_store.covering_view(_column_names(by, measures, where, where_not))
+    weight = None if table == awards_store.TABLE else awards_store.COUNT_COLUMN
+    sql, params = compile_sql(by, measures, where, where_not, table=table,
+                              dialect="sqlite", weight=weight, dropna=dropna)
+    with closing(awards_store.connect()) as con:
+        out = pd.read_sql_query(sql, con, params=params)
+    return _match_types(out, df, by, measures)
+
+
+def query_awards(df: pd.DataFrame, by=(), measures: dict | None = None,
+                 where: dict | None = None, where_not: dict | None = None,
+                 dropna: bool = True) -> pd.DataFrame:
+    """Filter ``df`` and aggregate it per ``by`` in one pass.
+
+    ``where`` / ``where_not`` map a column to the values to keep /
+    drop (like ``isin``). ``measures`` maps an output column to
+    ``(column, aggregation)`` with aggregation one of ``SQL_AGGREGATES``;
+    the default is a row count named "Count". Groups with a missing key
+    are left out unless ``dropna`` is False, and the result is sorted by
+    ``by``, as ``groupby`` does. With an empty ``by`` a single row of
+    totals is returned.
+    """
+    by = list(by)
+    measures = measures or DEFAULT_MEASURES
+    where = where or {}
+    where_not = where_not or {}
+    if not _column_names(by, measures, where, where_not):
+        # Nothing to scan: a plain row count
+        return pd.DataFrame([{name: len(df) for name in measures}])
+    if use_polars():
+        return _query_polars(df, by, measures, where, where_not, dropna)
+    if use_duckdb():
+        return _query_duckdb(df, by, measures, where, where_not, dropna)
+    return _query_pandas(df, by, measures, where, where_not, dropna)
+
+
+def query_dataset(by=(), measures: dict | None = None, where: dict | None = None,
+                  where_not: dict | None = None, dropna: bool = True) -> pd.DataFrame:
+    """``query_awards`` over the shared awards frame as the loader built it.
+
+    When the SQLite store holds the loaded version the query is answered
+    from its narrowest covering summary table (or the indexed full
+    table); otherwise it runs on the frame.
+    """
+    df, meta = get_dataset("awards")
+    if awards_store.store_ready(meta):
+        try:
+            return _query_sqlite(df, list(by), measures or DEFAULT_MEASURES,
+                                 where or {}, where_not or {}, dropna)
+        except sqlite3.Error as exc:
+            log.warning("SQLite store query failed, using the frame: %s", exc)
+    return query_awards(df, by, measures, where, where_not, dropna)
+
+
+def count_awards(df: pd.DataFrame, where: dict | None = None,
+                 where_not: dict | None = None) -> int:
+    """Number of rows matching the filters."""
+    return int(query_awards(df, where=where, where_not=where_not)["Count"].iloc[0])
@@ -0,0 +1,176 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from ingest import FINGERPRINT_COL
+from tenants import tenant_path
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 🗄️ INDEXED SQLITE AWARDS STORE
+# ---------------------------------------------------------
+# Optionally, every new version of the cleaned awards frame is also
+# written to an SQLite file. The file holds the full table, indexed on
+# the columns pages filter by, and summary tables with award counts at
+# the grain the pages aggregate at. Loaders that go through
+# ``awards_query.query_dataset`` read a few thousand summary rows instead
+# of scanning the frame. The file outlives the process, so a cold start
+# only has to open it. A new file is built beside the live one and
+# swapped in. It records the snapshot hash it was built from, and while
+# it lags behind the loaded data, queries run on the frame instead.
+# Other tenants get their own file beside it (``store_path``).
+SQLITE_STORE = os.environ.get("RR_SQLITE_STORE", "")
+
+TABLE = "awards"
+INDEXED_COLUMNS = [
+    "year", "Month_Num", "Team name", "New_Award_title", "Nominated In", "Employee Name",
+]
+# Summary table -> grain. Each row holds the number of awards in COUNT_COLUMN.
+AGGREGATE_VIEWS = {
+    "team_frequency": [
+        "year", "System", "Team_Canonical", "Team_Unknown", "New_Award_title", "Employee Name",
+    ],
+    "period_counts": [
+        "Period_M", "Period_Q", "Period_Y", "year", "System",
+        "Team_Canonical", "Team_Unknown", "New_Award_title", "Nominated In",
+    ],
+    "employee_totals": ["Employee Name", "Team name", "year", "New_Award_title"],
+}
+COUNT_COLUMN = "n_awards"
+# Object columns holding only these kinds of values are stored as they are
+_SQL_NATIVE = {"string", "integer", "floating", "mixed-integer-float", "empty"}
+
+_store_memo: dict = {}
+_write_lock = threading.Lock()
+
+
+def _quote(col: str) -> str:
+    return '"' + str(col).replace('"', '""') + '"'
+
+
+def _sql_value(v):
+    if pd.isna(v) or isinstance(v, (str, int, float)):
+        return v
+    return str(v)
+
+
+def _sql_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with values SQLite stores natively: text, numbers, NULL.
+
+    Datetimes become ISO text, which sorts chronologically, and flags
+    become 0/1. The ingestion fingerprint is bookkeeping and stays out.
+    """
+    columns = {}
+    for col in df.columns:
+        if col == FINGERPRINT_COL:
+            continue
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            text = np.datetime_as_string(s.to_numpy(dtype="datetime64[s]"))
+            s = pd.Series(np.where(s.isna(), None, text), index=s.index)
+        elif pd.api.types.is_bool_dtype(s):
+            s = s.astype("Int8")
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            # Convert each category once and broadcast through the codes
+            values = np.append(s.cat.categories.map(_sql_value).to_numpy(dtype=object), None)
+            s = pd.Series(values[s.cat.codes.to_numpy()], index=s.index)
+        elif s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) not in _SQL_NATIVE:
+            s = s.map(_sql_value)
+        columns[col] = s
+    return pd.DataFrame(columns)
+
+
+def _build(con, df: pd.DataFrame, digest: str):
+    _sql_frame(df).to_sql(TABLE, con, index=False, chunksize=50_000)
+    for col in INDEXED_COLUMNS:
+        if col in df.columns:
+            con.execute(f"CREATE INDEX {_quote('ix_' + col)} ON {TABLE} ({_quote(col)})")
+    views = [v for v, grain in AGGREGATE_VIEWS.items() if set(grain) <= set(df.columns)]
+    for view in views:
+        grain = AGGREGATE_VIEWS[view]
+        keys = ", ".join(_quote(c) for c in grain)
+        con.execute(
+            f"CREATE TABLE {view} AS SELECT {keys}, COUNT(*) AS {COUNT_COLUMN} "
+            f"FROM {TABLE} GROUP BY {keys}"
+        )
+    con.execute("CREATE TABLE store_meta (key TEXT PRIMARY KEY, value TEXT)")
+    con.executemany("INSERT INTO store_meta VALUES (?, ?)", [
+        ("hash", digest), ("rows", str(len(df))), ("views", ",".join(views)),
+        ("built_at", str(time.time())),
+    ])
+    con.commit()
+
+
+def store_path() -> str:
+    """The current tenant's store file ("" when the store is disabled)."""
+    return tenant_path(SQLITE_STORE)
+
+
+def write_store(df: pd.DataFrame, meta: dict):
+    """Rebuild the store from ``df`` unless it already holds this version."""
+    path = store_path()
+    if not path:
+        return
+    with _write_lock:
+        if store_hash() == meta.get("hash"):
+            return
+        started = time.time()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            with closing(sqlite3.connect(tmp)) as con:
+                _build(con, df, meta["hash"])
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    log.info("Wrote SQLite store %s (%d rows) in %.1fs", path, len(df), time.time() - started)
+
+
+def connect() -> sqlite3.Connection:
+    """Read-only connection to the store."""
+    return sqlite3.connect(f"file:{store_path()}?mode=ro", uri=True)
+
+
+def _store_meta() -> dict:
+    """The store's ``store_meta`` rows, re-read only when the file changes."""
+    path = store_path()
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    memo = _store_memo.setdefault(path, {})
+    if memo.get("stamp") != stamp:
+        try:
+            with closing(connect()) as con:
+                rows = dict(con.execute("SELECT key, value FROM store_meta").fetchall())
+        except sqlite3.Error as exc:
+            log.warning("Ignoring unreadable SQLite store %s: %s", path, exc)
+            rows = {}
+        memo.update(stamp=stamp, meta=rows)
+    return memo["meta"]
+
+
+def store_hash() -> str | None:
+    """Snapshot hash the store was built from (None when there is no store)."""
+    return _store_meta().get("hash") if SQLITE_STORE else None
+
+
+def store_ready(meta: dict | None) -> bool:
+    """True when the store is enabled and holds the version ``meta`` describes."""
+    return bool(SQLITE_STORE and meta and store_hash() == meta.get("hash"))
+
+
+def covering_view(columns) -> str:
+    """Narrowest summary table holding every column, else the full table."""
+    columns = set(columns)
+    built = _store_meta().get("views", "").split(",")
+    views = [v for v in built if v in AGGREGATE_VIEWS and columns <= set(AGGREGATE_VIEWS[v])]
+    return min(views, key=lambda v: len(AGGREGATE_VIEWS[v]), default=TABLE)
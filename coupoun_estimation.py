@@ -4,6 +4,8 @@ import numpy as np
 import plotly.graph_objects as go
 import warnings
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from awards_data import get_awards, get_awards_handle
+from datasets import HANDLE_HASH_FUNCS
 
 warnings.filterwarnings("ignore")
 
@@ -16,33 +18,6 @@ def show_glossary(title: str, description: str):
         st.markdown(description)
 
 
-# ============================================================
-# CLEANING UTILITIES
-# ============================================================
-def safe_numeric(s):
-    s = s.astype(str).str.replace(",", "", regex=False)
-    s = s.str.extract(r"(-?\d+\.?\d*)")[0]
-    return pd.to_numeric(s, errors="coerce")
-
-
-def create_date(df):
-    df["Month"] = df["Month"].astype(str).str.strip()
-    m1 = pd.to_datetime(df["Month"], format="%B", errors="coerce")
-    m2 = pd.to_datetime(df["Month"], format="%b", errors="coerce")
-    m3 = pd.to_numeric(df["Month"], errors="coerce")
-
-    df["Month_num"] = m1.dt.month.fillna(m2.dt.month).fillna(m3)
-    df = df[df["Month_num"].notna()].copy()
-    df["Month_num"] = df["Month_num"].astype(int)
-
-    df["Date"] = pd.to_datetime(
-        df["year"].astype(str) + "-" + df["Month_num"].astype(str) + "-01",
-        errors="coerce"
-    )
-
-    return df.dropna(subset=["Date"])
-
-
 # ============================================================
 # FIX FREQUENCY
 # ============================================================
@@ -137,9 +112,17 @@ def _holt_winters_forecast(series, periods, seasonal_period):
     return fallback()
 
 
-@st.cache_data(show_spinner=False)
-def holtwinters_auto_forecast(series, periods, seasonal_period):
-    return _holt_winters_forecast(series, periods, seasonal_period)
+# Keyed on a dataset handle (snapshot hash + filter), not on the series
+@st.cache_data(show_spinner=False, hash_funcs=HANDLE_HASH_FUNCS)
+def award_period_counts(handle, freq):
+    """Awards per calendar period ("M" or "Q") in the handle's rows, gaps as 0."""
+    df = handle.frame()
+    return df.groupby(pd.Grouper(key="Date", freq=freq))["Amount"].count().asfreq(freq).fillna(0)
+
+
+@st.cache_data(show_spinner=False, hash_funcs=HANDLE_HASH_FUNCS)
+def holtwinters_auto_forecast(handle, freq, periods, seasonal_period):
+    return _holt_winters_forecast(award_period_counts(handle, freq), periods, seasonal_period)
 
 
 # ============================================================
@@ -198,15 +181,8 @@ def show_coupon_estimation():
     # ============================================================
     with tab1:
 
-        sheet_key = "1xVpXomZBOyIeyvpyDjXQlSEIfU35v6j0jkhdaETm4-Q"
-
-        df = pd.read_csv(
-            f"https://docs.google.com/spreadsheets/d/{sheet_key}/export?format=csv"
-        )
-
-        df.columns = df.columns.str.strip()
-        df["Coupon Amount"] = safe_numeric(df["Coupon Amount"]).fillna(0)
-        df = create_date(df)
+        # Date and Amount are parsed once by the shared loader
+        df = get_awards().dropna(subset=["Date"])
 
         st.subheader("Filters")
 
@@ -229,13 +205,12 @@ def show_coupon_estimation():
         award_filter = col2.selectbox("Select Award Title", award_list,
                                       index=award_list.index(default_spot))
 
-        df_f = df[df["year"].isin(year_filter)]
-        df_f = df_f[df_f["New_Award_title"] == award_filter]
+        handle = get_awards_handle().filter({"year": year_filter, "New_Award_title": [award_filter]})
 
         has_spot, has_team, has_champion = get_award_type(award_filter)
 
-        monthly = df_f.groupby(pd.Grouper(key="Date", freq="M"))["Coupon Amount"].count().asfreq("M").fillna(0)
-        quarterly = df_f.groupby(pd.Grouper(key="Date", freq="Q"))["Coupon Amount"].count().asfreq("Q").fillna(0)
+        monthly = award_period_counts(handle, "M")
+        quarterly = award_period_counts(handle, "Q")
 
         st.subheader("Forecast Settings")
 
@@ -245,10 +220,10 @@ def show_coupon_estimation():
         )
 
         # Forecast models
-        monthly_fc = holtwinters_auto_forecast(monthly, forecast_period, 12) \
+        monthly_fc = holtwinters_auto_forecast(handle, "M", forecast_period, 12) \
             if has_spot else None
 
-        quarterly_fc = holtwinters_auto_forecast(quarterly, forecast_period, 4) \
+        quarterly_fc = holtwinters_auto_forecast(handle, "Q", forecast_period, 4) \
             if has_team or has_champion else None
 
         # ============================================================
@@ -346,6 +321,8 @@ import numpy as np
 import plotly.graph_objects as go
 import warnings
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from awards_data import get_awards, get_awards_handle
+from datasets import HANDLE_HASH_FUNCS
 
 warnings.filterwarnings("ignore")
 
@@ -358,33 +335,6 @@ def show_glossary(title: str, description: str):
         st.markdown(description)
 
 
-# ============================================================
-# CLEANING UTILITIES
-# ============================================================
-def safe_numeric(s):
-    s = s.astype(str).str.replace(",", "", regex=False)
-    s = s.str.extract(r"(-?\d+\.?\d*)")[0]
-    return pd.to_numeric(s, errors="coerce")
-
-
-def create_date(df):
-    df["Month"] = df["Month"].astype(str).str.strip()
-    m1 = pd.to_datetime(df["Month"], format="%B", errors="coerce")
-    m2 = pd.to_datetime(df["Month"], format="%b", errors="coerce")
-    m3 = pd.to_numeric(df["Month"], errors="coerce")
-
-    df["Month_num"] = m1.dt.month.fillna(m2.dt.month).fillna(m3)
-    df = df[df["Month_num"].notna()].copy()
-    df["Month_num"] = df["Month_num"].astype(int)
-
-    df["Date"] = pd.to_datetime(
-        df["year"].astype(str) + "-" + df["Month_num"].astype(str) + "-01",
-        errors="coerce"
-    )
-
-    return df.dropna(subset=["Date"])
-
-
 # ============================================================
 # FIX FREQUENCY
 # ============================================================
@@ -479,9 +429,17 @@ def _holt_winters_forecast(series, periods, seasonal_period):
     return fallback()
 
 
-@st.cache_data(show_spinner=False)
-def holtwinters_auto_forecast(series, periods, seasonal_period):
-    return _holt_winters_forecast(series, periods, seasonal_period)
+# Keyed on a dataset handle (snapshot hash + filter), not on the series
+@st.cache_data(show_spinner=False, hash_funcs=HANDLE_HASH_FUNCS)
+def award_period_counts(handle, freq):
+    """Awards per calendar period ("M" or "Q") in the handle's rows, gaps as 0."""
+    df = handle.frame()
+    return df.groupby(pd.Grouper(key="Date", freq=freq))["Amount"].count().asfreq(freq).fillna(0)
+
+
+@st.cache_data(show_spinner=False, hash_funcs=HANDLE_HASH_FUNCS)
+def holtwinters_auto_forecast(handle, freq, periods, seasonal_period):
+    return _holt_winters_forecast(award_period_counts(handle, freq), periods, seasonal_period)
 
 
 # ============================================================
@@ -540,15 +498,8 @@ def show_coupon_estimation():
     # ============================================================
     with tab1:
 
-        sheet_key = "1xVpXomZBOyIeyvpyDjXQlSEIfU35v6j0jkhdaETm4-Q"
-
-        df = pd.read_csv(
-            f"https://docs.google.com/spreadsheets/d/{sheet_key}/export?format=csv"
-        )
-
-        df.columns = df.columns.str.strip()
-        df["Coupon Amount"] = safe_numeric(df["Coupon Amount"]).fillna(0)
-        df = create_date(df)
+        # Date and Amount are parsed once by the shared loader
+        df = get_awards().dropna(subset=["Date"])
 
         st.subheader("Filters")
 
@@ -571,13 +522,12 @@ def show_coupon_estimation():
         award_filter = col2.selectbox("Select Award Title", award_list,
                                       index=award_list.index(default_spot))
 
-        df_f = df[df["year"].isin(year_filter)]
-        df_f = df_f[df_f["New_Award_title"] == award_filter]
+        handle = get_awards_handle().filter({"year": year_filter, "New_Award_title": [award_filter]})
 
         has_spot, has_team, has_champion = get_award_type(award_filter)
 
-        monthly = df_f.groupby(pd.Grouper(key="Date", freq="M"))["Coupon Amount"].count().asfreq("M").fillna(0)
-        quarterly = df_f.groupby(pd.Grouper(key="Date", freq="Q"))["Coupon Amount"].count().asfreq("Q").fillna(0)
+        monthly = award_period_counts(handle, "M")
+        quarterly = award_period_counts(handle, "Q")
 
         st.subheader("Forecast Settings")
 
@@ -587,10 +537,10 @@ def show_coupon_estimation():
         )
 
         # Forecast models
-        monthly_fc = holtwinters_auto_forecast(monthly, forecast_period, 12) \
+        monthly_fc = holtwinters_auto_forecast(handle, "M", forecast_period, 12) \
             if has_spot else None
 
-        quarterly_fc = holtwinters_auto_forecast(quarterly, forecast_period, 4) \
+        quarterly_fc = holtwinters_auto_forecast(handle, "Q", forecast_period, 4) \
             if has_team or has_champion else None
 
         # ============================================================
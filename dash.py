@@ -7,6 +7,14 @@ from reco_individual import show_recognition_individual_tab
 from award_analysis import show_award_analysis
 from coupoun_estimation import show_coupon_estimation
 from suggestions import show_suggestions_page
+from datasets import (
+    start_background_refresh, reset_datasets, describe_age, history_times, format_stamp, AS_OF_KEY,
+    memory_usage,
+)
+from tenants import TENANTS, TENANT_KEY
+from awards_data import get_awards_handle, awards_memory_report
+from data_sources import schema_report
+from sentiment import start_preload as start_sentiment_preload
 # from summary import show_summary  # optional
 
 # ------------------------------------------------------
@@ -38,6 +46,15 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# Keep survey and awards data fresh without blocking page renders.
+start_background_refresh()
+start_sentiment_preload()
+
+# Business unit: "?tenant=<name>" in the URL picks the starting one
+if TENANT_KEY not in st.session_state:
+    requested = st.query_params.get(TENANT_KEY)
+    st.session_state[TENANT_KEY] = requested if requested in TENANTS else TENANTS[0]
+
 # ------------------------------------------------------
 # SESSION STATE — Current Page
 # ------------------------------------------------------
@@ -129,19 +146,68 @@ with menu_col:
     with st.popover("⋮", use_container_width=False):
         st.markdown("### Actions")
 
+        if len(TENANTS) > 1:
+            # Past refreshes belong to one unit's data, so switching resets "As of"
+            st.selectbox("Business unit", TENANTS, key=TENANT_KEY,
+                         on_change=lambda: st.session_state.pop(AS_OF_KEY, None))
+
         # Row-wise buttons
         if st.button("Rerun App", use_container_width=True, type="primary"):
             st.rerun()
 
         if st.button("Clear Cache & Reload", use_container_width=True):
             st.cache_data.clear()
+            reset_datasets()
             st.rerun()
 
+        with st.expander("Awards data memory"):
+            # Measured on request: a deep memory count, and it needs the awards loaded
+            if st.button("Measure awards memory", use_container_width=True):
+                report = awards_memory_report(get_awards_handle())
+                st.caption(f"{report['MB'].sum():.2f} MB across {len(report)} columns")
+                st.dataframe(report[["Column", "Dtype", "MB"]], hide_index=True,
+                             use_container_width=True)
+            if len(TENANTS) > 1:
+                st.caption("Loaded datasets by business unit")
+                st.dataframe(memory_usage(), hide_index=True, use_container_width=True)
+
+        with st.expander("Awards schema check"):
+            checks = schema_report("awards")
+            if checks is None:
+                st.caption("Shown after the next read from the source.")
+            else:
+                st.dataframe(checks, hide_index=True, use_container_width=True)
+
 # ------------------------------------------------------
 # NAVBAR — Always below logo/title
 # ------------------------------------------------------
 show_navbar()
 
+# ------------------------------------------------------
+# DATA AGE — how old the data behind the pages is, and
+# AS OF — show every page as it was after a past refresh
+# ------------------------------------------------------
+age_col, as_of_col = st.columns([5, 1])
+
+with as_of_col:
+    past_refreshes = sorted(set(history_times("awards")) | set(history_times("survey")), reverse=True)
+    st.selectbox(
+        "As of",
+        [None] + past_refreshes,
+        format_func=lambda ts: "Latest data" if ts is None else f"As of {format_stamp(ts)}",
+        key=AS_OF_KEY,
+        label_visibility="collapsed",
+        disabled=not past_refreshes,
+    )
+
+with age_col:
+    st.markdown(
+        f"<p style='text-align:right; color:#666; font-size:0.8rem; margin-top:0.6rem;'>"
+        f"Awards data {describe_age('awards')} · "
+        f"Survey data {describe_age('survey')}</p>",
+        unsafe_allow_html=True,
+    )
+
 def recognition_main():
     tab1, tab2 = st.tabs(["Team", "Individual"])
     with tab1:
@@ -0,0 +1,347 @@
+import os
+import io
+import sqlite3
+import numpy as np
+import pandas as pd
+from http_fetch import fetch_bytes, forget_validators, forget_on_error, NotModified
+from tenants import qualified
+
+# ---------------------------------------------------------
+# 🔌 DATA SOURCES
+# ---------------------------------------------------------
+# Every dataset is read through a source spec "<backend>:<location>".
+# The defaults point at the live Google Sheets; set RR_<NAME>_SOURCE to
+# read the same dataset from somewhere else, for example:
+#
+#   RR_AWARDS_SOURCE=parquet:/data/awards.parquet
+#   RR_AWARDS_SOURCE=sqlite:/data/rr.db#awards
+#   RR_SURVEY_SOURCE=csv:/data/survey.csv
+#
+# Other tenants configure RR_<TENANT>_<NAME>_SOURCE (see ``tenants``).
+# A bare path is also accepted; the backend is then picked from its
+# file extension. All backends return a plain DataFrame, so the
+# cleaning code downstream does not care where the rows came from.
+DEFAULT_SOURCES = {
+    "awards": "gsheet:1xVpXomZBOyIeyvpyDjXQlSEIfU35v6j0jkhdaETm4-Q",
+    "survey": "gsheet:1KSuP5YlzyI1jdVTMMu5v7MLyzvP9Emr3Fo94BsiSFo0",
+}
+# The export URL template can be pointed at a local HTTP stand-in that
+# serves fixture files, e.g. "http://127.0.0.1:8000/{key}.csv".
+GSHEET_EXPORT_URL = os.environ.get(
+    "RR_GSHEET_EXPORT_URL",
+    "https://docs.google.com/spreadsheets/d/{key}/export?format=csv",
+)
+# Rows per chunk for streaming ingestion (0 reads each export in one go)
+CHUNK_ROWS = int(os.environ.get("RR_CHUNK_ROWS", 0))
+
+EXTENSION_BACKENDS = {
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+    ".xls": "xlsx",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+}
+
+
+def get_source_spec(name: str) -> str:
+    """Return the configured source spec for a dataset name (in the current tenant)."""
+    key = qualified(name)
+    env_spec = os.environ.get(f"RR_{key.upper().replace('.', '_')}_SOURCE")
+    if env_spec:
+        return env_spec.strip()
+    if key not in DEFAULT_SOURCES:
+        raise KeyError(f"No data source configured for '{key}'")
+    return DEFAULT_SOURCES[key]
+
+
+def parse_source_spec(spec: str) -> tuple[str, str]:
+    """Split a spec into (backend, location)."""
+    backend, sep, location = spec.partition(":")
+    if sep and backend.lower() in SOURCE_BACKENDS:
+        return backend.lower(), location
+    # No explicit backend (or a Windows drive letter): use the extension
+    path = spec.split("#", 1)[0]
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXTENSION_BACKENDS:
+        return EXTENSION_BACKENDS[ext], spec
+    raise ValueError(f"Cannot infer a data source backend from '{spec}'")
+
+
+# -----------------------
+# Column schemas
+# -----------------------
+# A dataset can declare the columns its pages use. Only those are parsed
+# (``usecols`` for text and Excel exports, a column projection for
+# Parquet and SQLite), text columns named in ``dtypes`` are parsed
+# straight into those types, and every read is checked against the
+# declaration: a missing required column fails the read with a clear
+# message (so the last good snapshot stays in service) instead of
+# surfacing later as a KeyError on some page.
+class SchemaError(ValueError):
+    """A source lacks columns its dataset requires."""
+
+
+class SourceSchema:
+    """Columns a dataset reads, matched case-insensitively after stripping.
+
+    Matched headers come back spelled as in the schema, e.g. "Year" as
+    "year", so the pages can rely on the names they use.
+
+    ``optional`` columns are read when present; any column whose name
+    contains one of ``keywords`` is read too. ``numeric`` columns are
+    checked for values that do not parse as numbers.
+    """
+
+    def __init__(self, required, optional=(), dtypes=None, keywords=(), numeric=()):
+        self.required = list(required)
+        self.optional = list(optional)
+        self.dtypes = dict(dtypes or {})
+        self.keywords = tuple(k.lower() for k in keywords)
+        self.numeric = list(numeric)
+        self._names = {c.lower() for c in self.required + self.optional}
+
+    def wants(self, column) -> bool:
+        name = str(column).strip().lower()
+        return name in self._names or any(k in name for k in self.keywords)
+
+    def columns(self, available) -> list:
+        return [c for c in available if self.wants(c)]
+
+    def spell(self, columns) -> list:
+        """Stripped header names, schema columns renamed to the schema's spelling.
+
+        A header is left alone when its schema spelling is already taken.
+        """
+        spelling = {c.lower(): c for c in self.required + self.optional}
+        names = [str(c).strip() for c in columns]
+        taken = set(names)
+        renamed = []
+        for name in names:
+            target = spelling.get(name.lower(), name)
+            if target != name and target not in taken:
+                taken.add(target)
+                name = target
+            renamed.append(name)
+        return renamed
+
+
+_reports: dict = {}
+
+
+def validate_frame(name: str, df: pd.DataFrame, schema: SourceSchema, ignored=()) -> pd.DataFrame:
+    """Per-column validation report; raises ``SchemaError`` if required columns are missing.
+
+    The report is also kept for ``schema_report(name)``.
+    """
+    rows = []
+    for col in df.columns:
+        bad = 0
+        if col in schema.numeric and not pd.api.types.is_numeric_dtype(df[col]):
+            # Parse each distinct value once
+            counts = df[col].value_counts()
+            parsed = pd.to_numeric(counts.index.astype(str), errors="coerce")
+            bad = int(counts[pd.isna(parsed)].sum())
+        rows.append({
+            "Column": col,
+            "Status": "required" if col in schema.required else "optional",
+            "Dtype": str(df[col].dtype),
+            "Missing %": round(float(df[col].isna().mean()) * 100, 1) if len(df) else 0.0,
+            "Unparseable": bad,
+        })
+    missing = [c for c in schema.required if c not in df.columns]
+    rows += [{"Column": c, "Status": "MISSING (required)"} for c in missing]
+    rows += [{"Column": c, "Status": "absent (optional)"} for c in schema.optional if c not in df.columns]
+    rows += [{"Column": str(c), "Status": "not read"} for c in ignored]
+    report = pd.DataFrame(rows, columns=["Column", "Status", "Dtype", "Missing %", "Unparseable"])
+    _reports[qualified(name)] = report
+    if missing:
+        raise SchemaError(f"The '{name}' source is missing required columns: {', '.join(missing)}")
+    return report
+
+
+def schema_report(name: str) -> pd.DataFrame | None:
+    """Validation report of the last read of a dataset (None before any read)."""
+    return _reports.get(qualified(name))
+
+
+def normalise_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """Use NaN for missing text values, as ``pd.read_csv`` does.
+
+    Parquet and SQLite hand back ``None`` in text columns, which the
+    pages would otherwise turn into the string "None".
+    """
+    obj_cols = df.columns[df.dtypes == object]
+    if len(obj_cols):
+        df[obj_cols] = df[obj_cols].fillna(np.nan)
+    return df
+
+
+# -----------------------
+# Backends
+# -----------------------
+# ``columns`` is a predicate on header names selecting what to read
+# (None reads everything).
+def _read_gsheet(location: str, columns=None, **csv_kwargs) -> pd.DataFrame:
+    # Raises NotModified before parsing when the export is unchanged
+    body = fetch_bytes(GSHEET_EXPORT_URL.format(key=location))
+    return pd.read_csv(io.BytesIO(body), usecols=columns, **csv_kwargs)
+
+
+def forget_source_validators(name: str):
+    """Make the next Google export read of dataset ``name`` a full download."""
+    backend, location = parse_source_spec(get_source_spec(name))
+    if backend == "gsheet":
+        forget_validators(GSHEET_EXPORT_URL.format(key=location))
+
+
+def _read_csv(location: str, columns=None, **csv_kwargs) -> pd.DataFrame:
+    return pd.read_csv(location, usecols=columns, **csv_kwargs)
+
+
+def _read_xlsx(location: str, columns=None, **_) -> pd.DataFrame:
+    path, _, sheet = location.partition("#")
+    return pd.read_excel(path, sheet_name=sheet or 0, usecols=columns)
+
+
+def _read_parquet(location: str, columns=None, **_) -> pd.DataFrame:
+    if columns is not None:
+        import pyarrow.parquet as pq
+
+        columns = [c for c in pq.read_schema(location).names if columns(c)]
+    return pd.read_parquet(location, columns=columns)
+
+
+def _select_sql(con, table: str, columns=None) -> str:
+    if columns is None:
+        return f'SELECT * FROM "{table}"'
+    names = [row[1] for row in con.execute(f'PRAGMA table_info("{table}")') if columns(row[1])]
+    return "SELECT " + ", ".join('"' + n.replace('"', '""') + '"' for n in names) + f' FROM "{table}"'
+
+
+def _read_sqlite(location: str, columns=None, **_) -> pd.DataFrame:
+    path, _, table = location.partition("#")
+    if not table:
+        raise ValueError(f"SQLite source '{location}' needs a table, e.g. rr.db#awards")
+    with sqlite3.connect(path) as con:
+        return pd.read_sql_query(_select_sql(con, table, columns), con)
+
+
+SOURCE_BACKENDS = {
+    "gsheet": _read_gsheet,
+    "csv": _read_csv,
+    "xlsx": _read_xlsx,
+    "parquet": _read_parquet,
+    "sqlite": _read_sqlite,
+}
+
+
+def _column_filter(schema: SourceSchema | None, ignored: list):
+    """Predicate for the backends that also records the columns it skips."""
+    if schema is None:
+        return None
+
+    def wanted(column) -> bool:
+        keep = schema.wants(column)
+        if not keep:
+            ignored.append(column)
+        return keep
+
+    return wanted
+
+
+def _header(columns, schema: SourceSchema | None) -> list:
+    if schema is None:
+        return list(columns.astype(str).str.strip())
+    return schema.spell(columns)
+
+
+def read_source(name: str, schema: SourceSchema | None = None, **csv_kwargs) -> pd.DataFrame:
+    """Read a dataset from its configured backend.
+
+    ``csv_kwargs`` are forwarded to ``pd.read_csv`` for the text
+    backends (Google export and local CSV) and ignored by the others.
+    With a ``schema`` only its columns are read and the result is
+    validated (see ``validate_frame``). The Google backend raises
+    ``NotModified`` when the export has not changed since the last
+    successful read.
+    """
+    backend, location = parse_source_spec(get_source_spec(name))
+    ignored = []
+    if schema is not None and schema.dtypes and backend in ("gsheet", "csv"):
+        csv_kwargs.setdefault("dtype", schema.dtypes)
+    df = SOURCE_BACKENDS[backend](location, columns=_column_filter(schema, ignored), **csv_kwargs)
+    df.columns = _header(df.columns, schema)
+    df = normalise_missing(df)
+    if schema is not None:
+        validate_frame(name, df, schema, dict.fromkeys(ignored))
+    return df
+
+
+# -----------------------
+# Chunked reads
+# -----------------------
+# Each generator yields DataFrames of at most ``chunksize`` rows so an
+# export can be cleaned and stored piece by piece. Text exports are read
+# as strings so a column cannot change type from one chunk to the next.
+# Excel files cannot be streamed by pandas and arrive as a single chunk.
+def _chunks_gsheet(location: str, chunksize: int, columns=None, **csv_kwargs):
+    body = fetch_bytes(GSHEET_EXPORT_URL.format(key=location))
+    yield from pd.read_csv(io.BytesIO(body), chunksize=chunksize, dtype=str, usecols=columns, **csv_kwargs)
+
+
+def _chunks_csv(location: str, chunksize: int, columns=None, **csv_kwargs):
+    yield from pd.read_csv(location, chunksize=chunksize, dtype=str, usecols=columns, **csv_kwargs)
+
+
+def _chunks_xlsx(location: str, chunksize: int, columns=None, **_):
+    yield _read_xlsx(location, columns)
+
+
+def _chunks_parquet(location: str, chunksize: int, columns=None, **_):
+    import pyarrow.parquet as pq
+
+    source = pq.ParquetFile(location)
+    if columns is not None:
+        columns = [c for c in source.schema_arrow.names if columns(c)]
+    for batch in source.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+def _chunks_sqlite(location: str, chunksize: int, columns=None, **_):
+    path, _, table = location.partition("#")
+    if not table:
+        raise ValueError(f"SQLite source '{location}' needs a table, e.g. rr.db#awards")
+    with sqlite3.connect(path) as con:
+        yield from pd.read_sql_query(_select_sql(con, table, columns), con, chunksize=chunksize)
+
+
+CHUNK_BACKENDS = {
+    "gsheet": _chunks_gsheet,
+    "csv": _chunks_csv,
+    "xlsx": _chunks_xlsx,
+    "parquet": _chunks_parquet,
+    "sqlite": _chunks_sqlite,
+}
+
+
+def read_source_chunks(name: str, chunksize: int = CHUNK_ROWS, schema: SourceSchema | None = None,
+                       **csv_kwargs):
+    """Like ``read_source`` but yields the rows in chunks of ``chunksize``.
+
+    The ``schema`` check runs on the first chunk (text exports are read
+    as strings here, so its dtype hints do not apply).
+    """
+    backend, location = parse_source_spec(get_source_spec(name))
+    ignored = []
+    chunks = CHUNK_BACKENDS[backend](
+        location, max(int(chunksize), 1), columns=_column_filter(schema, ignored), **csv_kwargs
+    )
+    for i, df in enumerate(chunks):
+        df.columns = _header(df.columns, schema)
+        df = normalise_missing(df)
+        if schema is not None and i == 0:
+            validate_frame(name, df, schema, dict.fromkeys(ignored))
+        yield df
@@ -0,0 +1,422 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import streamlit as st
+import pandas as pd
+from snapshot_store import load_or_build, list_versions, read_version, read_changes
+from ingest import change_set
+from tenants import TENANTS, current_tenant, tenant_scope, qualified, tenant_budget_bytes
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 🔄 IN-MEMORY DATASET REGISTRY + BACKGROUND REFRESH
+# ---------------------------------------------------------
+# Loaders register a build function per dataset. Page renders read the
+# current in-memory version and never wait on the network: the first
+# read serves the on-disk snapshot whatever its age, and a background
+# thread re-pulls every source on a schedule and swaps the new version
+# in atomically. Only a cold start with no snapshot at all blocks.
+# Datasets are held per tenant, under their ``qualified`` names.
+REFRESH_INTERVAL_SECONDS = int(os.environ.get("RR_REFRESH_INTERVAL", 300))
+
+_builders: dict = {}
+_listeners: dict = {}
+_keys: dict = {}
+_current: dict = {}
+# One lock per dataset key: a cold load and a refresh of the same
+# dataset never build side by side, other datasets load in parallel.
+_build_locks: dict = {}
+_build_locks_guard = threading.Lock()
+_past: dict = {}
+_past_lock = threading.Lock()
+_changes: dict = {}
+
+
+def register_dataset(name: str, build_fn, on_update=None, key_columns=None):
+    """Declare how to fetch and clean a dataset.
+
+    ``build_fn(previous)`` receives the frame currently held (or None).
+    ``on_update(df, meta)``, if given (one hook or a list), runs in a
+    background thread whenever a version is loaded or a new one swapped
+    in, e.g. to keep a derived store in step. ``key_columns`` identify a record across
+    versions, so the change feed can tell an edit from a new row.
+    """
+    _builders[name] = build_fn
+    if on_update is not None:
+        _listeners[name] = list(on_update) if isinstance(on_update, (list, tuple)) else [on_update]
+    if key_columns:
+        _keys[name] = list(key_columns)
+
+
+def _run_hooks(tenant: str, name: str, hooks: list, version: tuple):
+    with tenant_scope(tenant):
+        for on_update in hooks:
+            try:
+                on_update(*version)
+            except Exception as exc:
+                log.warning("Update hook for '%s' failed: %s", qualified(name), exc)
+
+
+def _notify(name: str, version: tuple):
+    hooks = _listeners.get(name)
+    if not hooks:
+        return
+    # Off the caller's thread, so a page render never waits on the hooks
+    threading.Thread(
+        target=_run_hooks, args=(current_tenant(), name, hooks, version),
+        name=f"rr-{qualified(name)}-update", daemon=True,
+    ).start()
+
+
+def _build_lock(key: str) -> threading.Lock:
+    with _build_locks_guard:
+        return _build_locks.setdefault(key, threading.Lock())
+
+
+def get_dataset(name: str) -> tuple[pd.DataFrame, dict]:
+    """Return the ``(frame, meta)`` version to show without blocking on refresh.
+
+    That is the current tenant's current version, or the one in effect
+    at the session's "As of" time when one is selected.
+    """
+    key = qualified(name)
+    version = _current.get(key)
+    if version is None:
+        with _build_lock(key):
+            version = _current.get(key)
+            if version is None:
+                version = load_or_build(key, _builders[name], ttl=float("inf"))
+                _admit(key, version)
+                _notify(name, version)
+    _touch(key)
+    as_of = selected_as_of()
+    return version if as_of is None else _version_as_of(key, as_of, version)
+
+
+def refresh_dataset(name: str) -> tuple[pd.DataFrame, dict]:
+    """Re-pull a dataset from its source and swap it in.
+
+    When the source is unreachable the previous version stays in place.
+    Waits for a load or refresh of the same dataset already under way.
+    """
+    key = qualified(name)
+    with _build_lock(key):
+        current = _current.get(key)
+        df, meta = load_or_build(key, _builders[name], force=True, current=current)
+        if current is not None and (meta.get("stale") or meta["hash"] == current[1].get("hash")):
+            # Nothing new: keep serving the frame pages already hold
+            df = current[0]
+            _keep(key, (df, meta))
+            return df, meta
+        _admit(key, (df, meta))
+    _notify(name, (df, meta))
+    return df, meta
+
+
+def refresh_all():
+    for tenant in TENANTS:
+        with tenant_scope(tenant):
+            for name in list(_builders):
+                # Only datasets held in memory are kept fresh: refreshing an
+                # evicted one would load it back in and undo the eviction.
+                # Its next read serves the snapshot and it is refreshed from then on
+                if qualified(name) not in _current:
+                    continue
+                if _build_lock(qualified(name)).locked():
+                    # A page is loading it right now; that version is fresh
+                    continue
+                try:
+                    refresh_dataset(name)
+                except Exception as exc:
+                    log.warning("Background refresh of '%s' failed: %s", qualified(name), exc)
+
+
+def reset_datasets():
+    """Forget the in-memory versions; the next read reloads from disk."""
+    with _budget_lock:
+        _current.clear()
+        _past.clear()
+        _changes.clear()
+        _sizes.clear()
+        _last_used.clear()
+
+
+def _refresh_loop(interval: float):
+    while True:
+        refresh_all()
+        time.sleep(interval)
+
+
+@st.cache_resource
+def start_background_refresh(interval: float = REFRESH_INTERVAL_SECONDS) -> threading.Thread:
+    """Start the process-wide refresher thread (once per process)."""
+    thread = threading.Thread(
+        target=_refresh_loop, args=(interval,), name="rr-data-refresh", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def data_age(name: str) -> float | None:
+    """Seconds since the loaded version was last confirmed against its source."""
+    version = _current.get(qualified(name))
+    if version is None:
+        return None
+    return time.time() - version[1].get("checked_at", time.time())
+
+
+def format_age(seconds: float | None) -> str:
+    if seconds is None:
+        return "loading..."
+    if seconds < 60:
+        return "updated just now"
+    if seconds < 3600:
+        return f"updated {int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"updated {int(seconds // 3600)} h ago"
+    return f"updated {int(seconds // 86400)} d ago"
+
+
+def describe_age(name: str) -> str:
+    """Short human-readable data-age label for the UI."""
+    as_of = selected_as_of()
+    if as_of is not None:
+        return f"as of {format_stamp(as_of)}"
+    text = format_age(data_age(name))
+    version = _current.get(qualified(name))
+    if version is not None and version[1].get("stale"):
+        text += " (source unreachable)"
+    return text
+
+
+# -----------------------
+# Memory budgets
+# -----------------------
+# Every tenant's loaded datasets are held to its own budget: when a load
+# takes a tenant over it, that tenant's least recently used datasets are
+# dropped (they reload from the on-disk snapshot on next use), so a
+# large tenant only ever evicts its own data. RR_MEMORY_BUDGET_MB caps
+# the whole process as well; past it, datasets of tenants using more
+# than an equal share go first, least recently used first. One lock
+# covers the held versions and their sizes and last-use times, so
+# loads, refreshes and evictions on different threads see them agree.
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("RR_MEMORY_BUDGET_MB", 0)) * 1_048_576)
+
+_sizes: dict = {}
+_last_used: dict = {}
+_budget_lock = threading.Lock()
+
+
+def _tenant_of(key: str) -> str:
+    tenant, sep, _ = key.partition(".")
+    return tenant if sep and tenant in TENANTS else "default"
+
+
+def _usage(tenant: str) -> int:
+    return sum(size for key, size in _sizes.items() if _tenant_of(key) == tenant)
+
+
+def _least_recent(keys) -> str | None:
+    return min(keys, key=lambda k: _last_used.get(k, 0.0), default=None)
+
+
+# _usage, _least_recent and _evict expect the caller to hold _budget_lock
+def _evict(key: str):
+    log.info("Evicting dataset '%s' (%.1f MB) from memory", key, _sizes.get(key, 0) / 1_048_576)
+    _current.pop(key, None)
+    _sizes.pop(key, None)
+    _last_used.pop(key, None)
+    _changes.pop(key, None)
+    for past_key in [k for k in _past if k[0] == key]:
+        _past.pop(past_key, None)
+
+
+def _admit(key: str, version: tuple):
+    """Hold ``version`` as the current one for ``key`` and enforce the budgets."""
+    size = int(version[0].memory_usage(deep=True).sum())  # slow, so outside the lock
+    tenant = _tenant_of(key)
+    budget = tenant_budget_bytes(tenant)
+    with _budget_lock:
+        _current[key] = version
+        _sizes[key] = size
+        _last_used[key] = time.monotonic()
+        while budget and _usage(tenant) > budget:
+            victim = _least_recent(k for k in _sizes if k != key and _tenant_of(k) == tenant)
+            if victim is None:
+                break
+            _evict(victim)
+        while MEMORY_BUDGET_BYTES and sum(_sizes.values()) > MEMORY_BUDGET_BYTES:
+            share = MEMORY_BUDGET_BYTES / len({_tenant_of(k) for k in _sizes})
+            others = [k for k in _sizes if k != key]
+            victim = _least_recent([k for k in others if _usage(_tenant_of(k)) > share] or others)
+            if victim is None:
+                break
+            _evict(victim)
+
+
+def _keep(key: str, version: tuple):
+    """Swap in ``version``, whose frame is the one already held for ``key``."""
+    with _budget_lock:
+        if key in _sizes:
+            _current[key] = version
+            return
+    _admit(key, version)  # evicted while it was being refreshed
+
+
+def _touch(key: str):
+    with _budget_lock:
+        if key in _sizes:
+            _last_used[key] = time.monotonic()
+
+
+def memory_usage() -> pd.DataFrame:
+    """Loaded datasets per tenant with their size and budget, in MB."""
+    with _budget_lock:
+        sizes = list(_sizes.items())
+    rows = [{
+        "Tenant": _tenant_of(key), "Dataset": key, "MB": round(size / 1_048_576, 2),
+        "Budget MB": round(tenant_budget_bytes(_tenant_of(key)) / 1_048_576, 2) or None,
+    } for key, size in sizes]
+    return pd.DataFrame(rows, columns=["Tenant", "Dataset", "MB", "Budget MB"])
+
+# -----------------------
+# Point-in-time views
+# -----------------------
+# Each session may pick an "As of" time (a past refresh) under AS_OF_KEY.
+# Every page then sees, for each dataset, the version that was current
+# at that time, rebuilt from the snapshot history. Rebuilt versions are
+# shared between sessions; the PAST_VERSIONS most recent stay in memory.
+AS_OF_KEY = "as_of"
+PAST_VERSIONS = 4
+
+
+def selected_as_of() -> float | None:
+    """The session's "As of" timestamp, or None for the latest data."""
+    try:
+        return st.session_state.get(AS_OF_KEY)
+    except Exception:  # no session outside a script run (background threads)
+        return None
+
+
+def format_stamp(ts: float) -> str:
+    return time.strftime("%d %b %Y %H:%M", time.localtime(ts))
+
+
+def history_times(name: str) -> list[float]:
+    """Save times of the recorded past versions of a dataset, newest first.
+
+    The latest version is left out: it is what "Latest" shows.
+    """
+    return [v["saved_at"] for v in reversed(list_versions(qualified(name))[:-1])]
+
+
+def _version_as_of(key: str, as_of: float, current: tuple) -> tuple[pd.DataFrame, dict]:
+    versions = list_versions(key)
+    if not versions:
+        return current
+    # Before the first recorded version, the oldest one is the best answer
+    entry = next((v for v in reversed(versions) if v["saved_at"] <= as_of), versions[0])
+    if entry["hash"] == current[1].get("hash"):
+        return current
+    past_key = (key, entry["seq"])
+    version = _past.get(past_key)
+    if version is None:
+        with _past_lock:
+            version = _past.get(past_key)
+            if version is None:
+                try:
+                    version = read_version(key, entry["seq"])
+                except KeyError as exc:  # recorded in an older history format
+                    log.warning("Cannot rebuild %s: %s", key, exc)
+                    return current
+                while len(_past) >= PAST_VERSIONS:
+                    _past.pop(next(iter(_past)))
+                _past[past_key] = version
+    return version
+
+# -----------------------
+# Change feed
+# -----------------------
+# What the last refresh changed, from the delta the snapshot history
+# stored for it: the rows were matched by fingerprint when the version
+# was recorded, so only the changed rows are read back here.
+def dataset_changes(name: str) -> tuple[pd.DataFrame, dict] | None:
+    """``(changes, version)`` for the version on show, or None if unknown.
+
+    ``changes`` has a ``Change`` column (New, Edited or Removed) in front
+    of the dataset's columns; ``version`` is its history entry.
+    """
+    meta = get_dataset(name)[1]
+    key = qualified(name)
+    entry = next((v for v in reversed(list_versions(key)) if v["hash"] == meta.get("hash")), None)
+    if entry is None or not entry["delta"]:
+        return None
+    cached = _changes.get(key)
+    if cached is None or cached[0] != entry["seq"]:
+        changes = read_changes(key, entry["seq"])
+        if changes is None:  # recorded in an older history format
+            return None
+        cached = _changes[key] = (entry["seq"], change_set(*changes, _keys.get(name)))
+    return cached[1], entry
+
+# -----------------------
+# Dataset handles
+# -----------------------
+# Cached builders take a handle instead of a frame. Streamlit would
+# otherwise hash the whole frame on every call; a handle is keyed on the
+# dataset name, the snapshot hash and a fingerprint of the filter, so
+# lookups take constant time and the key changes exactly when the data
+# or the filter does. Decorate with ``hash_funcs=HANDLE_HASH_FUNCS``.
+class DatasetHandle:
+    """One version of a dataset, optionally filtered, usable as a cache key."""
+
+    __slots__ = ("name", "version", "where", "_frame")
+
+    def __init__(self, name: str, version: str, frame: pd.DataFrame, where: dict | None = None):
+        self.name = name
+        self.version = version
+        self.where = where or {}
+        self._frame = frame
+
+    @property
+    def fingerprint(self) -> str:
+        """Stable digest of the filter ("" when unfiltered)."""
+        if not self.where:
+            return ""
+        spec = {col: sorted(map(str, values)) for col, values in self.where.items()}
+        return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+    @property
+    def key(self) -> tuple:
+        return self.name, self.version, self.fingerprint
+
+    def filter(self, where: dict) -> "DatasetHandle":
+        """Handle on the rows whose columns are in the given value lists."""
+        return DatasetHandle(self.name, self.version, self._frame, {**self.where, **where})
+
+    def frame(self) -> pd.DataFrame:
+        """The rows this handle stands for (from its own version, even if
+        a newer one has been swapped in since)."""
+        df = self._frame
+        if self.where:
+            mask = pd.Series(True, index=df.index)
+            for col, values in self.where.items():
+                mask &= df[col].isin(list(values))
+            return df[mask]
+        return df.copy(deep=False)
+
+    def __repr__(self) -> str:
+        return f"DatasetHandle{self.key}"
+
+
+HANDLE_HASH_FUNCS = {DatasetHandle: lambda handle: handle.key}
+
+
+def get_handle(name: str) -> DatasetHandle:
+    """Handle on the current version of a dataset."""
+    df, meta = get_dataset(name)
+    return DatasetHandle(qualified(name), meta["hash"], df)
@@ -0,0 +1,222 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+import pandas as pd
+from snapshot_store import SNAPSHOT_DIR
+from tenants import tenant_path
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 🪪 ENTITY RESOLUTION FOR TEAM AND EMPLOYEE NAMES
+# ---------------------------------------------------------
+# Names that are spelled differently but mean the same person or team
+# are listed in a reviewable alias table (CSV: kind, alias, canonical,
+# score, status). The loaders map every ``alias`` of a kind to its
+# ``canonical`` name when the status is ``auto`` or ``approved``;
+# ``suggested`` rows wait for a reviewer, and ``rejected`` rows are kept
+# so the same pair is never proposed again. Existing rows are never
+# rewritten: the table only grows as new variants show up.
+#
+# Candidates are found by blocking on character trigrams: only names
+# that share a trigram no more than BLOCK_LIMIT names contain are
+# considered, and only pairs whose trigram sets overlap by at least
+# MIN_OVERLAP (Dice coefficient) are scored, so the work grows roughly
+# linearly with the number of distinct names. Variants with the same normalised key (case, spacing
+# and punctuation aside) are aliased automatically; other pairs scoring
+# at least SUGGEST_SCORE are suggested. Names with different digits
+# ("Person 15", "Person 16") are never paired. Each tenant has its own
+# table (``alias_path``).
+ALIAS_FILE = os.environ.get("RR_ALIAS_FILE", os.path.join(SNAPSHOT_DIR, "aliases.csv"))
+SUGGEST_SCORE = float(os.environ.get("RR_ALIAS_SCORE", 0.85))
+BLOCK_LIMIT = 50
+MIN_OVERLAP = 0.5
+NGRAM = 3
+ALIAS_COLUMNS = ["kind", "alias", "canonical", "score", "status"]
+APPLIED_STATUSES = {"auto", "approved"}
+
+_score_memo: dict = {}
+_alias_memo: dict = {}
+_write_lock = threading.Lock()
+
+
+def name_key(name) -> str:
+    """Lower-case letters and digits only, single-spaced."""
+    return " ".join(re.sub(r"[^a-z0-9]", " ", str(name).lower()).split())
+
+
+def ngrams(key: str, n: int = NGRAM) -> set:
+    padded = f" {key} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+def similarity(a: str, b: str) -> float:
+    """Edit-based similarity of two keys in [0, 1], memoised per pair."""
+    pair = (a, b) if a <= b else (b, a)
+    if pair not in _score_memo:
+        if re.findall(r"\d+", a) != re.findall(r"\d+", b):
+            _score_memo[pair] = 0.0
+        else:
+            _score_memo[pair] = SequenceMatcher(None, *pair).ratio()
+    return _score_memo[pair]
+
+
+def candidate_pairs(keys: list) -> list:
+    """Index pairs of keys that share a selective trigram and overlap enough to score."""
+    grams = [ngrams(key) for key in keys]
+    blocks = defaultdict(list)
+    for i, key_grams in enumerate(grams):
+        for gram in key_grams:
+            blocks[gram].append(i)
+    pairs = set()
+    for ids in blocks.values():
+        if 1 < len(ids) <= BLOCK_LIMIT:
+            pairs.update(combinations(ids, 2))
+    return [(a, b) for a, b in pairs
+            if 2 * len(grams[a] & grams[b]) >= MIN_OVERLAP * (len(grams[a]) + len(grams[b]))]
+
+
+def suggest_aliases(kind: str, counts: pd.Series) -> pd.DataFrame:
+    """Alias rows for the distinct names in ``counts`` (name -> rows).
+
+    Matching names are clustered and every variant is aliased to the
+    most frequent name of its cluster.
+    """
+    counts = counts[counts.index.notna() & (counts > 0)]
+    names = [str(n) for n in counts.index]
+    if not names:
+        return pd.DataFrame(columns=ALIAS_COLUMNS)
+    keys = [name_key(n) for n in names]
+
+    # Union-find over exact-key matches and scored candidate pairs
+    parent = list(range(len(names)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first_with_key = {}
+    for i, key in enumerate(keys):
+        parent[find(i)] = find(first_with_key.setdefault(key, i))
+    unique_keys = list(first_with_key)
+    for a, b in candidate_pairs(unique_keys):
+        if similarity(unique_keys[a], unique_keys[b]) >= SUGGEST_SCORE:
+            parent[find(first_with_key[unique_keys[a]])] = find(first_with_key[unique_keys[b]])
+
+    clusters = defaultdict(list)
+    for i in range(len(names)):
+        clusters[find(i)].append(i)
+    rows = []
+    weight = counts.to_numpy()
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        top = min(members, key=lambda i: (-weight[i], names[i]))
+        for i in members:
+            if i == top:
+                continue
+            same = keys[i] == keys[top]
+            rows.append({
+                "kind": kind, "alias": names[i], "canonical": names[top],
+                "score": 1.0 if same else round(similarity(keys[i], keys[top]), 3),
+                "status": "auto" if same else "suggested",
+            })
+    return pd.DataFrame(rows, columns=ALIAS_COLUMNS)
+
+
+# -----------------------
+# Alias table
+# -----------------------
+def alias_path() -> str:
+    """The current tenant's alias table ("" when disabled)."""
+    return tenant_path(ALIAS_FILE)
+
+
+def read_alias_table() -> pd.DataFrame:
+    path = alias_path()
+    if not path or not os.path.exists(path):
+        return pd.DataFrame(columns=ALIAS_COLUMNS)
+    try:
+        table = pd.read_csv(path, dtype=str, keep_default_na=False)
+    except (OSError, ValueError, pd.errors.ParserError) as exc:
+        log.warning("Ignoring unreadable alias table %s: %s", path, exc)
+        return pd.DataFrame(columns=ALIAS_COLUMNS)
+    return table.reindex(columns=ALIAS_COLUMNS)
+
+
+def update_alias_table(kind: str, counts: pd.Series) -> int:
+    """Append new suggestions for ``kind`` to the table; returns how many."""
+    path = alias_path()
+    if not path:
+        return 0
+    with _write_lock:
+        table = read_alias_table()
+        known = set(zip(table["kind"], table["alias"]))
+        fresh = suggest_aliases(kind, counts)
+        fresh = fresh[[(kind, a) not in known for a in fresh["alias"]]]
+        if fresh.empty:
+            return 0
+        table = pd.concat([table, fresh.astype({"score": str})], ignore_index=True)
+        table = table.sort_values(["kind", "canonical", "alias"], kind="stable")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        table.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    log.info("Added %d %s alias suggestions to %s", len(fresh), kind, path)
+    return len(fresh)
+
+
+def alias_digest() -> str:
+    """Hash of the applied aliases; changes whenever a decision does."""
+    return _applied_aliases()["digest"]
+
+
+def _applied_aliases() -> dict:
+    """``{"digest", "exact": {kind: {alias: canonical}}, "by_key": ...}``,
+    re-read only when the file changes."""
+    path = alias_path()
+    try:
+        stamp = (os.stat(path).st_mtime_ns, os.stat(path).st_size) if path else None
+    except OSError:
+        stamp = None
+    memo = _alias_memo.setdefault(path, {})
+    if memo.get("stamp") != stamp or "aliases" not in memo:
+        table = read_alias_table()
+        table = table[table["status"].str.strip().str.lower().isin(APPLIED_STATUSES)]
+        exact, by_key = defaultdict(dict), defaultdict(dict)
+        for kind, alias, canonical in table[["kind", "alias", "canonical"]].itertuples(index=False):
+            exact[kind][alias] = canonical
+            by_key[kind].setdefault(name_key(alias), canonical)
+            by_key[kind].setdefault(name_key(canonical), canonical)
+        text = table[["kind", "alias", "canonical"]].sort_values(["kind", "alias"]).to_csv(index=False)
+        memo.update(stamp=stamp, aliases={
+            "digest": hashlib.sha1(text.encode()).hexdigest(), "exact": exact, "by_key": by_key,
+        })
+    return memo["aliases"]
+
+
+def resolve_alias(kind: str, name):
+    """Canonical name for ``name`` (unchanged when it has no alias).
+
+    Spelling variants of a listed alias or canonical name that have not
+    been added to the table yet resolve through their normalised key.
+    """
+    if not isinstance(name, str):
+        return name
+    aliases = _applied_aliases()
+    exact, by_key = aliases["exact"].get(kind, {}), aliases["by_key"].get(kind, {})
+    seen = set()
+    while name not in seen:
+        seen.add(name)
+        target = exact.get(name) or by_key.get(name_key(name), name)
+        if target == name:
+            break
+        name = target
+    return name
@@ -1,5 +1,7 @@
 import streamlit as st
 import styles
+from awards_data import get_awards_changes
+from datasets import format_stamp
 
 # ---------------------------------------------------------
 # 🧭 NAVIGATION BAR (Gapless + Clean Header Fix)
@@ -114,5 +116,42 @@ def show_home_page():
         - Recommendations and fairness analysis  
         """)
 
+    show_change_feed()
+
     st.markdown("---")
     st.caption("Designed for the Capstone R&R Analysis — Bringing clarity to recognition trends.")
+
+
+# ---------------------------------------------------------
+# 🆕 CHANGE FEED — awards added, edited or removed by the last refresh
+# ---------------------------------------------------------
+FEED_COLUMNS = [
+    "Change", "Employee Name", "Team name", "New_Award_title", "Month", "year", "Changed columns",
+]
+FEED_ROWS = 10
+
+
+def show_change_feed():
+    st.markdown("---")
+    st.markdown("### What Changed Since the Last Refresh")
+    feed = get_awards_changes()
+    if feed is None:
+        st.caption("No earlier version of the awards data has been recorded yet.")
+        return
+    changes, version = feed
+    counts = changes["Change"].value_counts()
+    st.caption(
+        f"Refresh of {format_stamp(version['saved_at'])}: "
+        f"{counts.get('New', 0)} new · {counts.get('Edited', 0)} edited · "
+        f"{counts.get('Removed', 0)} removed"
+    )
+    if changes.empty:
+        return
+    columns = [c for c in FEED_COLUMNS if c in changes.columns]
+    st.dataframe(changes[columns].head(FEED_ROWS), hide_index=True, use_container_width=True)
+    st.download_button(
+        "Download all changes (CSV)",
+        changes.to_csv(index=False).encode("utf-8"),
+        file_name=f"awards_changes_{version['seq']:05d}.csv",
+        mime="text/csv",
+    )
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------------------------------------------------------
+# 🌐 POOLED, CONDITIONAL HTTP FETCHING
+# ---------------------------------------------------------
+# One keep-alive session is shared by every download. Each URL remembers
+# the validators of its last successful response (ETag, Last-Modified
+# and a hash of the body). The next request is sent conditionally, and
+# an unchanged export raises ``NotModified`` before anything is parsed.
+# Google's export endpoint rarely sends validators, so the body hash is
+# the usual way a no-change refresh is detected. Validators saved while
+# a dataset is built are dropped again if the build fails
+# (``forget_on_error``), so an export that could not be used is not
+# reported as unchanged on the next refresh.
+REQUEST_TIMEOUT_SECONDS = 30
+
+_session = None
+_session_lock = threading.Lock()
+_validators: dict = {}
+_saved = threading.local()
+
+
+class NotModified(Exception):
+    """The resource is unchanged since the last successful fetch."""
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=2)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive",
+                    "User-Agent": "rr-dashboard",
+                })
+                _session = session
+    return _session
+
+
+def fetch_bytes(url: str, conditional: bool = True) -> bytes:
+    """Download ``url``, raising ``NotModified`` when nothing changed."""
+    previous = _validators.get(url) if conditional else None
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    resp = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT_SECONDS)
+    if resp.status_code == 304 and previous:
+        raise NotModified(url)
+    resp.raise_for_status()
+
+    body = resp.content
+    digest = hashlib.sha1(body).hexdigest()
+    if previous and previous.get("hash") == digest:
+        raise NotModified(url)
+
+    _validators[url] = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "hash": digest,
+    }
+    saved = getattr(_saved, "urls", None)
+    if saved is not None:
+        saved.append(url)
+    return body
+
+
+def forget_validators(url: str | None = None):
+    """Make the next fetch of ``url`` (or of every URL) unconditional."""
+    if url is None:
+        _validators.clear()
+    else:
+        _validators.pop(url, None)
+
+
+@contextmanager
+def forget_on_error():
+    """Forget the validators saved inside the block if it raises.
+
+    ``NotModified`` counts as an error too: a build that stops there
+    never used what the other downloads of the block returned.
+    """
+    outer = getattr(_saved, "urls", None)
+    _saved.urls = urls = []
+    try:
+        yield
+    except BaseException:
+        for url in urls:
+            _validators.pop(url, None)
+        raise
+    finally:
+        _saved.urls = outer
+    if outer is not None:
+        outer.extend(urls)
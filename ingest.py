@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# ➕ INCREMENTAL (APPEND-ONLY) INGESTION
+# ---------------------------------------------------------
+# Every stored row carries a fingerprint of its raw values. On refresh
+# the raw export is fingerprinted (a vectorised hash, no cleaning) and
+# only rows that are newer than the stored watermark or whose
+# fingerprint is not stored yet go through the cleaning step. Stored
+# rows whose fingerprint disappeared from the export (edited or deleted)
+# are dropped. Cleaning cost therefore grows with the number of new
+# rows, not with the total history.
+FINGERPRINT_COL = "_row_fp"
+
+
+def row_fingerprints(raw: pd.DataFrame) -> np.ndarray:
+    """One uint64 per row; identical rows get distinct values by occurrence."""
+    if raw.empty:
+        return np.empty(0, dtype="uint64")
+    fp = pd.util.hash_pandas_object(raw, index=False)
+    occurrence = fp.groupby(fp.to_numpy()).cumcount()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({"fp": fp.to_numpy(), "n": occurrence.to_numpy()}), index=False
+    ).to_numpy()
+
+
+def incremental_ingest(previous: pd.DataFrame | None, raw: pd.DataFrame,
+                       clean_fn, period_key_fn) -> pd.DataFrame:
+    """Merge a fresh raw export into the previously cleaned frame.
+
+    ``clean_fn`` turns raw rows into cleaned rows and must be row-local
+    (each output row depends only on its own input row) and keep the
+    index. ``period_key_fn`` returns a sortable integer period per row
+    (e.g. ``year * 100 + month``); the highest stored period is the
+    watermark. The result keeps the raw export's row order.
+    """
+    raw = raw.reset_index(drop=True)
+    raw_cols = list(raw.columns)
+    fps = row_fingerprints(raw)
+
+    if previous is None or previous.empty or FINGERPRINT_COL not in previous.columns \
+            or list(previous.columns[:len(raw_cols)]) != raw_cols:
+        out = clean_fn(raw)
+        out[FINGERPRINT_COL] = fps
+        return out
+
+    # Rows past the watermark are new by definition; only the older ones
+    # are looked up among the stored fingerprints.
+    watermark = period_key_fn(previous).max()
+    newer = (period_key_fn(raw) > watermark).to_numpy()
+    older_pos = np.flatnonzero(~newer)
+    stored_pos = pd.Index(fps[older_pos]).get_indexer(previous[FINGERPRINT_COL].to_numpy())
+    keep = stored_pos >= 0
+    seen = np.zeros(len(raw), dtype=bool)
+    seen[older_pos[stored_pos[keep]]] = True
+    todo = ~seen
+
+    position = np.concatenate([older_pos[stored_pos[keep]], np.flatnonzero(todo)])
+    in_order = not (np.diff(position) < 0).any()
+    if not todo.any() and keep.all() and in_order:
+        return previous
+
+    kept = previous[keep]
+    fresh = clean_fn(raw[todo])
+    fresh[FINGERPRINT_COL] = fps[todo]
+    out = pd.concat([kept, fresh], ignore_index=True)
+
+    # Restore the export's row order (already right for a pure append)
+    if not in_order:
+        out = out.iloc[np.argsort(position, kind="stable")].reset_index(drop=True)
+    return out
+
+
+# -----------------------
+# Change sets
+# -----------------------
+CHANGE_COL = "Change"
+CHANGED_COLUMNS_COL = "Changed columns"
+
+
+def change_set(added: pd.DataFrame, removed: pd.DataFrame, key=None) -> pd.DataFrame:
+    """New, edited and removed rows between two versions of a frame.
+
+    ``added`` and ``removed`` are the rows whose fingerprints appear in
+    only one version. An added and a removed row with the same ``key``
+    values (matched by occurrence) are reported once, as an edit showing
+    the new values and the columns that changed.
+    """
+    added = added.drop(columns=FINGERPRINT_COL, errors="ignore").reset_index(drop=True)
+    removed = removed.drop(columns=FINGERPRINT_COL, errors="ignore").reset_index(drop=True)
+    edited_at = np.full(len(added), -1)
+    if key and set(key) <= set(added.columns) & set(removed.columns) and len(added) and len(removed):
+        edited_at = pd.Index(row_fingerprints(removed[key].astype(str))).get_indexer(
+            row_fingerprints(added[key].astype(str))
+        )
+    edited = edited_at >= 0
+
+    changed = pd.Series("", index=added.index, dtype=object)
+    if edited.any():
+        new = added[edited]
+        old = removed.iloc[edited_at[edited]].set_index(new.index)
+        diff = pd.DataFrame({
+            col: ~((new[col].astype(object) == old[col].astype(object)) | (new[col].isna() & old[col].isna()))
+            for col in new.columns if col in old.columns
+        })
+        changed[edited] = diff.apply(lambda row: ", ".join(diff.columns[row.to_numpy()]), axis=1)
+
+    gone = np.ones(len(removed), dtype=bool)
+    gone[edited_at[edited]] = False
+    out = pd.concat([
+        added[~edited].assign(**{CHANGE_COL: "New"}),
+        added[edited].assign(**{CHANGE_COL: "Edited", CHANGED_COLUMNS_COL: changed[edited]}),
+        removed[gone].assign(**{CHANGE_COL: "Removed"}),
+    ], ignore_index=True)
+    if CHANGED_COLUMNS_COL not in out.columns:
+        out[CHANGED_COLUMNS_COL] = np.nan
+    return out[[CHANGE_COL] + [c for c in out.columns if c != CHANGE_COL]]
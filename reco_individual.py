@@ -3,6 +3,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+from awards_data import get_awards, fill_category
+from awards_query import query_awards, query_dataset
 
 
 # -------------------------------------------------
@@ -81,18 +83,12 @@ def show_recognition_individual_tab():
     st.markdown(GLASS_KPI_CSS, unsafe_allow_html=True)
 
     # ---------------- LOAD DATA ----------------
-    sheet_key = "1xVpXomZBOyIeyvpyDjXQlSEIfU35v6j0jkhdaETm4-Q"
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_key}/export?format=csv"
-    df = pd.read_csv(url)
+    df = get_awards()
 
     # ---------------- CLEAN DATA ----------------
-    expected_cols = ["Team name", "Employee Name", "year", "Award Date", "New_Award_title"]
-    for c in expected_cols:
-        if c not in df.columns:
-            df[c] = pd.NA
-
-    df["Team name"] = df["Team name"].fillna("Unknown Team")
-    df["Employee Name"] = df["Employee Name"].astype(str).fillna("Unknown")
+    # The loader guarantees the columns used here (see AWARDS_SCHEMA)
+    df["Team name"] = fill_category(df["Team name"], "Unknown Team")
+    df["Employee Name"] = fill_category(df["Employee Name"], "Unknown")
     df["year"] = pd.to_numeric(df["year"], errors="coerce")
 
     if "month" not in df.columns and "Award Date" in df.columns:
@@ -192,13 +188,20 @@ def show_recognition_individual_tab():
 
     st.markdown("### 📊 Key Performance Indicators Based Upon Filters")
 
-    kpi_df = filtered_df[
-        ~filtered_df["New_Award_title"].astype(str).str.contains("ota", case=False, na=False)
-    ]
-
-    total_employees = kpi_df["Employee Name"].nunique()
-    total_awards = len(kpi_df)
-    employee_awards = kpi_df.groupby("Employee Name")["New_Award_title"].count()
+    # KPIs leave OTA awards out
+    titles = filtered_df["New_Award_title"].astype("category").cat.categories
+    not_ota = {"New_Award_title": [t for t in titles if "ota" in str(t).lower()]}
+
+    kpis = query_awards(filtered_df, where_not=not_ota, measures={
+        "Employees": ("Employee Name", "nunique"),
+        "Awards": (None, "size"),
+    }).iloc[0]
+    total_employees = int(kpis["Employees"])
+    total_awards = int(kpis["Awards"])
+    employee_awards = query_awards(
+        filtered_df, by=["Employee Name"], where_not=not_ota,
+        measures={"Awards": ("New_Award_title", "count")},
+    ).set_index("Employee Name")["Awards"]
 
     top_performer_awards = int(employee_awards.max()) if len(employee_awards) else 0
     employees_with_multiple = int((employee_awards > 1).sum())
@@ -261,9 +264,8 @@ def show_recognition_individual_tab():
     st.subheader("🌟 Most Awards Received For Individuals")
 
     top_ind = (
-        filtered_df.groupby(["Employee Name", "Team name"])["New_Award_title"]
-        .count()
-        .reset_index(name="Total Awards")
+        query_awards(filtered_df, by=["Employee Name", "Team name"],
+                     measures={"Total Awards": ("New_Award_title", "count")})
         .sort_values("Total Awards", ascending=False)
         .head(15)
     )
@@ -317,12 +319,9 @@ def show_recognition_individual_tab():
 
     if len(employee_awards):
         top_10 = employee_awards.nlargest(10).index
-        top_df = filtered_df[filtered_df["Employee Name"].isin(top_10)]
-
-        award_type_counts = (
-            top_df.groupby(["Employee Name", "New_Award_title"])
-            .size()
-            .reset_index(name="Count")
+        award_type_counts = query_awards(
+            filtered_df, by=["Employee Name", "New_Award_title"],
+            where={"Employee Name": top_10.tolist()},
         )
 
         if len(award_type_counts):
@@ -355,7 +354,7 @@ def show_recognition_individual_tab():
 
     if len(filtered_df):
         top20 = (
-            filtered_df.groupby(["Employee Name", "Team name"])
+            filtered_df.groupby(["Employee Name", "Team name"], observed=True)
             .agg({"New_Award_title": ["count", lambda x: ", ".join(x.dropna().unique()[:3])]})
             .reset_index()
         )
@@ -385,7 +384,7 @@ def show_recognition_individual_tab():
 
     if len(filtered_df):
         summary = (
-            filtered_df.groupby("Employee Name")
+            filtered_df.groupby("Employee Name", observed=True)
             .agg({"New_Award_title": "count", "Team name": "first"}).reset_index()
         )
         summary.columns = ["Employee Name", "Awards", "Team"]
@@ -417,10 +416,19 @@ def show_recognition_individual_tab():
 
     st.subheader("📉 Team-Level Recognition Gaps")
 
-    team_awards = df.groupby("Team name")["New_Award_title"].count().reset_index()
-    team_size = df.groupby("Team name")["Employee Name"].nunique().reset_index()
-
-    team_gap = pd.merge(team_awards, team_size, on="Team name", how="outer")
+    # Awards per team and employee from the shared dataset, with the same
+    # fill-ins as the filters above
+    team_people = query_dataset(
+        by=["Team name", "Employee Name"],
+        measures={"Awards": ("New_Award_title", "count")},
+        dropna=False,
+    )
+    team_people["Team name"] = fill_category(team_people["Team name"], "Unknown Team")
+    team_people["Employee Name"] = fill_category(team_people["Employee Name"], "Unknown")
+    team_gap = team_people.groupby("Team name", observed=True).agg(
+        total_awards=("Awards", "sum"),
+        total_employees=("Employee Name", "nunique"),
+    ).reset_index()
     team_gap.columns = ["Team", "Total Awards", "Total Employees"]
 
     team_gap["Total Awards"] = pd.to_numeric(team_gap["Total Awards"].fillna(0), errors="coerce").fillna(0)
@@ -2,8 +2,9 @@ import streamlit as st
 import styles
 import pandas as pd
 import plotly.express as px
-import re
 import html
+from awards_data import get_awards, PERIOD_COLUMNS, SYSTEM_ALL_HANDS, SYSTEM_KUDOS
+from awards_query import query_dataset
 
 # -----------------------
 # Global Glass / KPI CSS
@@ -85,80 +86,12 @@ def show_glossary(title: str, description: str):
 # -----------------------
 # Helpers
 # -----------------------
-def normalize_name(name):
-    if pd.isna(name):
-        return name
-    name = str(name).strip().lower()
-    name = re.sub(r"\s+", " ", name)
-    name = re.sub(r"[^a-z\s]", "", name)
-    return name
-
-def _find_amount_col(df: pd.DataFrame) -> str | None:
-    candidates = [
-        "Coupon Amount", "Coupon Amount (₹)", "Coupon amount",
-        "Coupon", "Amount", "Budget", "Allocation",
-        "Award Amount", "Award_Value", "CouponValue", "Coupon_Value"
-    ]
-    lower_cols = {c.lower(): c for c in df.columns}
-    for cand in candidates:
-        if cand.lower() in lower_cols:
-            return lower_cols[cand.lower()]
-    for c in df.columns:
-        lc = c.lower()
-        if any(k in lc for k in ["coupon", "amount", "allocation", "budget"]):
-            return c
-    return None
-
-def _to_number(series: pd.Series) -> pd.Series:
-    s = series.astype(str)
-    s = s.str.replace("\u20b9", "", regex=False)
-    s = s.str.replace(",", "", regex=False)
-    s = s.str.strip()
-    extracted = s.str.extract(r"(-?\d+(?:\.\d+)?)", expand=False)
-    return pd.to_numeric(extracted, errors="coerce").fillna(0.0)
-
 def load_and_process_data():
-    url = "https://docs.google.com/spreadsheets/d/1xVpXomZBOyIeyvpyDjXQlSEIfU35v6j0jkhdaETm4-Q/export?format=xlsx"
-    df = pd.read_excel(url)
-
-    df['year'] = pd.to_numeric(df['year'], errors='coerce').fillna(0).astype(int)
-    df = df[df['year'] > 0]
-
-    month_map = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4,
-        'May': 5, 'June': 6, 'July': 7, 'August': 8,
-        'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
-    df['Month'] = df['Month'].astype(str).str.strip().str.capitalize()
-    df['Month_Num'] = df['Month'].map(month_map)
-    df['Date'] = pd.to_datetime(
-        dict(year=df['year'], month=df['Month_Num'], day=1),
-        errors='coerce'
-    )
-
-    team_mapping = {
-        'greenmath': 'Greenmath',
-        'edgecore': 'Edgecore',
-        'edgecre': 'Edgecore',
-        'pr - greenmath launch': 'PR - Greenmath Launch',
-    }
-    df['Team name'] = (
-        df['Team name']
-        .astype(str).str.strip().str.lower()
-        .map(lambda t: team_mapping.get(t, t))
-        .str.title()
-    )
-
-    df = df[
-        (df['Team name'].notna()) &
-        (df['Team name'].astype(str).str.strip() != '') &
-        (~df['Team name'].astype(str).str.strip().str.lower().isin(['nan', 'none', 'null', 'unknown', 'unknown team'])) &
-        (~df['Team name'].astype(str).str.lower().str.contains('unknown', na=False))
-    ].copy()
-
-    amt_col = _find_amount_col(df)
-    df['Amount'] = _to_number(df[amt_col]) if amt_col else 0.0
-
+    # Date, periods, canonical team, unknown flag, System and Amount are
+    # derived once by the shared loader
+    df = get_awards()
+    df = df[(df['year'].fillna(0) > 0) & ~df['Team_Unknown']].copy()
+    df['Team name'] = df['Team_Canonical']
     return df
 
 def clean_teamname_df(df, column='Team name'):
@@ -175,53 +108,45 @@ def clean_teamname_df(df, column='Team name'):
 # KPIs
 # -----------------------
 def display_team_level_kpis(
-    df_allhands: pd.DataFrame, 
-    df_kudos: pd.DataFrame,
+    allhands_filter,
+    kudos_filter,
     selected_years,
     team_mode,
     selected_team,
     top_team_count,
     freq_award_filter: list,
-    df_original: pd.DataFrame
 ):
     """Display KPIs - react to award filter"""
-    
-    df_original_filtered = df_original[df_original['year'].isin(selected_years)].copy()
-    total_teams_overall = int(df_original_filtered['Team name'].nunique())
-    
-    df_allhands = df_allhands[df_allhands['year'].isin(selected_years)] if df_allhands is not None and not df_allhands.empty else pd.DataFrame()
-    df_kudos = df_kudos[df_kudos['year'].isin(selected_years)] if df_kudos is not None and not df_kudos.empty else pd.DataFrame()
-    
+
+    where = {'year': selected_years, 'Team_Unknown': [False]}
+    team_stats = {'Teams': ('Team_Canonical', 'nunique'), 'Awards': (None, 'size')}
+    total_teams_overall = int(query_dataset(where=where, measures=team_stats)['Teams'].iloc[0])
+
     if freq_award_filter:
-        df_allhands = df_allhands[df_allhands['New_Award_title'].isin(freq_award_filter)] if not df_allhands.empty else pd.DataFrame()
-        df_kudos = df_kudos[df_kudos['New_Award_title'].isin(freq_award_filter)] if not df_kudos.empty else pd.DataFrame()
-    
-    df_allhands_clean = clean_teamname_df(df_allhands) if not df_allhands.empty else pd.DataFrame()
-    df_kudos_clean = clean_teamname_df(df_kudos) if not df_kudos.empty else pd.DataFrame()
-    
+        where['New_Award_title'] = freq_award_filter
+
     if team_mode == "Single Team" and selected_team and selected_team != "All Teams":
-        df_allhands_clean = df_allhands_clean[df_allhands_clean['Team name'] == selected_team]
-        df_kudos_clean = df_kudos_clean[df_kudos_clean['Team name'] == selected_team]
+        where['Team_Canonical'] = [selected_team]
     elif team_mode == "Most Couponed Teams" and top_team_count:
-        combined = pd.concat([df_allhands_clean, df_kudos_clean])
-        top_teams = combined['Team name'].value_counts().head(top_team_count).index.tolist()
-        df_allhands_clean = df_allhands_clean[df_allhands_clean['Team name'].isin(top_teams)]
-        df_kudos_clean = df_kudos_clean[df_kudos_clean['Team name'].isin(top_teams)]
-    
-    distinct_all = int(df_allhands_clean['Team name'].nunique()) if not df_allhands_clean.empty else 0
-    distinct_kudos = int(df_kudos_clean['Team name'].nunique()) if not df_kudos_clean.empty else 0
-
-    def avg_teams_per_month(df: pd.DataFrame) -> int:
-        if df is None or df.empty or 'Date' not in df.columns:
-            return 0
-        monthly = df.groupby(df['Date'].dt.to_period('M'))['Team name'].nunique()
-        if monthly.empty:
-            return 0
-        return int(round(monthly.mean()))
-
-    avg_month_all = avg_teams_per_month(df_allhands_clean)
-    avg_month_kudos = avg_teams_per_month(df_kudos_clean)
-    total_awards = len(df_allhands_clean) + len(df_kudos_clean)
+        counts = pd.concat([
+            query_dataset(by=['Team_Canonical'], where={**where, **system_where}, where_not=system_where_not)
+            for system_where, system_where_not in (allhands_filter, kudos_filter)
+        ]).groupby('Team_Canonical', observed=True)['Count'].sum()
+        top_teams = counts.sort_values(ascending=False, kind='stable').head(top_team_count)
+        where['Team_Canonical'] = top_teams.index.tolist()
+
+    def system_kpis(system_filter) -> tuple[int, int, int]:
+        """Distinct teams, average teams per month and awards in one system."""
+        system_where, system_where_not = system_filter
+        kwargs = dict(where={**where, **system_where}, where_not=system_where_not, measures=team_stats)
+        totals = query_dataset(**kwargs).iloc[0]
+        monthly = query_dataset(by=['Period_M'], **kwargs)
+        avg_month = int(round(monthly['Teams'].mean())) if not monthly.empty else 0
+        return int(totals['Teams']), avg_month, int(totals['Awards'])
+
+    distinct_all, avg_month_all, awards_all = system_kpis(allhands_filter)
+    distinct_kudos, avg_month_kudos, awards_kudos = system_kpis(kudos_filter)
+    total_awards = awards_all + awards_kudos
 
     st.subheader("Team Recognition KPIs")
     c1, c2, c3, c4, c5, c6 = st.columns(6)
@@ -325,7 +250,6 @@ def display_team_level_kpis(
 # Team frequency table
 # -----------------------
 def build_team_frequency_table(
-    df: pd.DataFrame,
     selected_years,
     team_mode,
     selected_team,
@@ -333,12 +257,15 @@ def build_team_frequency_table(
     freq_award_filter: list,
     employee_team_map=None
 ):
-    df_freq = df[df['year'].isin(selected_years)].copy()
-    
+    # Award counts per team, award type and employee ('n') from the shared
+    # dataset; everything below works on these few rows
+    where = {'year': selected_years, 'Team_Unknown': [False]}
     if freq_award_filter:
-        df_freq = df_freq[df_freq['New_Award_title'].isin(freq_award_filter)]
-    
-    df_freq = clean_teamname_df(df_freq, column='Team name')
+        where['New_Award_title'] = freq_award_filter
+    df_freq = query_dataset(
+        by=['Team_Canonical', 'New_Award_title', 'Employee Name'],
+        where=where, measures={'n': (None, 'size')}, dropna=False,
+    ).rename(columns={'Team_Canonical': 'Team name'})
 
     if employee_team_map is not None and not employee_team_map.empty:
         awesome_award_rows = df_freq[df_freq['New_Award_title'] == 'Awesome Award'].copy()
@@ -367,8 +294,8 @@ def build_team_frequency_table(
         if selected_team and selected_team != "All Teams":
             df_freq = df_freq[df_freq['Team name'] == selected_team]
     elif team_mode == "Most Couponed Teams":
-        counts = df_freq['Team name'].value_counts()
-        top_teams = counts.head(top_team_count).index.tolist()
+        counts = df_freq.groupby('Team name', observed=True)['n'].sum()
+        top_teams = counts.sort_values(ascending=False, kind='stable').head(top_team_count).index.tolist()
         df_freq = df_freq[df_freq['Team name'].isin(top_teams)]
 
     if df_freq.empty:
@@ -382,13 +309,22 @@ def build_team_frequency_table(
             "Total Awesome Awards",
         ])
 
-    grouped = df_freq.groupby('Team name').agg(
+    df_freq = df_freq.assign(**{
+        col: df_freq['n'].where(df_freq['New_Award_title'] == title, 0)
+        for col, title in [
+            ('team_awards', 'Team Award'),
+            ('spot_awards', 'Spot Award'),
+            ('champion_awards', 'Champion Award'),
+            ('awesome_awards', 'Awesome Award'),
+        ]
+    })
+    grouped = df_freq.groupby('Team name', observed=True).agg(
         distinct_people=('Employee Name', 'nunique'),
-        times_awarded=('New_Award_title', 'size'),
-        total_team_awards=('New_Award_title', lambda s: (s == 'Team Award').sum()),
-        total_spot_awards=('New_Award_title', lambda s: (s == 'Spot Award').sum()),
-        total_champion_awards=('New_Award_title', lambda s: (s == 'Champion Award').sum()),
-        total_awesome_awards=('New_Award_title', lambda s: (s == 'Awesome Award').sum()),
+        times_awarded=('n', 'sum'),
+        total_team_awards=('team_awards', 'sum'),
+        total_spot_awards=('spot_awards', 'sum'),
+        total_champion_awards=('champion_awards', 'sum'),
+        total_awesome_awards=('awesome_awards', 'sum'),
     ).reset_index()
 
     grouped['total_awards_internal'] = (
@@ -417,78 +353,39 @@ def build_team_frequency_table(
 # -----------------------
 # LINE CHARTS
 # -----------------------
-def build_allhands_trend(df_allhands, selected_years, time_period):
-    df_filtered = df_allhands[
-        (df_allhands['New_Award_title'].isin(['Team Award', 'Champion Award'])) &
-        (df_allhands['year'].isin(selected_years))
-    ].copy()
-    df_filtered = clean_teamname_df(df_filtered, column='Team name')
-    
-    if df_filtered.empty:
-        return None
-    
-    if time_period == "Monthly":
-        df_filtered['Period'] = df_filtered['Date'].dt.to_period('M').dt.to_timestamp()
-    elif time_period == "Quarterly":
-        df_filtered['Period'] = df_filtered['Date'].dt.to_period('Q').dt.to_timestamp()
-    else:
-        df_filtered['Period'] = df_filtered['Date'].dt.to_period('Y').dt.to_timestamp()
-    
-    df_filtered = df_filtered.dropna(subset=['Period'])
-    
-    trend_df = (
-        df_filtered
-        .groupby(['Period', 'Team name'], as_index=False)
-        .size()
-        .rename(columns={'size': 'Total_Awards'})
-    )
-    
-    return trend_df
+def _trend_counts(time_period, system_filter, where, where_not=None):
+    """Awards per period and team from the shared dataset, as plotted by the trend charts."""
+    period_col = PERIOD_COLUMNS[time_period]
+    system_where, system_where_not = system_filter
+    return query_dataset(
+        by=[period_col, 'Team_Canonical'],
+        where={'Team_Unknown': [False], **system_where, **where},
+        where_not={**system_where_not, **(where_not or {})},
+        measures={'Total_Awards': (None, 'size')},
+    ).rename(columns={period_col: 'Period', 'Team_Canonical': 'Team name'})
+
+def build_allhands_trend(system_filter, selected_years, time_period):
+    return _trend_counts(time_period, system_filter, {
+        'New_Award_title': ['Team Award', 'Champion Award'],
+        'year': selected_years,
+    })
 
-def build_kudos_trend(df_kudos, selected_years, time_period, employee_team_map):
-    dfs = []
-    
+def build_kudos_trend(system_filter, selected_years, time_period, employee_team_map):
+    # Product teams count every award type, other teams only team-level ones
     product_teams = ['Greenmath', 'Edgecore']
-    product_df = df_kudos[
-        (df_kudos['Team name'].isin(product_teams)) &
-        (df_kudos['New_Award_title'].isin(['Team Award', 'Spot Award', 'Champion Award', 'Awesome Award'])) &
-        (df_kudos['year'].isin(selected_years))
-    ].copy()
-    product_df = clean_teamname_df(product_df, column='Team name')
-    if not product_df.empty:
-        dfs.append(product_df)
-    
-    other_df = df_kudos[
-        (~df_kudos['Team name'].isin(product_teams)) &
-        (df_kudos['New_Award_title'].isin(['Team Award', 'Champion Award'])) &
-        (df_kudos['year'].isin(selected_years))
-    ].copy()
-    other_df = clean_teamname_df(other_df, column='Team name')
-    if not other_df.empty:
-        dfs.append(other_df)
-    
-    if not dfs:
-        return None
-    
-    df_filtered = pd.concat(dfs, ignore_index=True)
-    
-    if time_period == "Monthly":
-        df_filtered['Period'] = df_filtered['Date'].dt.to_period('M').dt.to_timestamp()
-    elif time_period == "Quarterly":
-        df_filtered['Period'] = df_filtered['Date'].dt.to_period('Q').dt.to_timestamp()
-    else:
-        df_filtered['Period'] = df_filtered['Date'].dt.to_period('Y').dt.to_timestamp()
-    
-    df_filtered = df_filtered.dropna(subset=['Period'])
-    
-    trend_df = (
-        df_filtered
-        .groupby(['Period', 'Team name'], as_index=False)
-        .size()
-        .rename(columns={'size': 'Total_Awards'})
+    product_trend = _trend_counts(time_period, system_filter, {
+        'Team_Canonical': product_teams,
+        'New_Award_title': ['Team Award', 'Spot Award', 'Champion Award', 'Awesome Award'],
+        'year': selected_years,
+    })
+    other_trend = _trend_counts(
+        time_period, system_filter,
+        {'New_Award_title': ['Team Award', 'Champion Award'], 'year': selected_years},
+        where_not={'Team_Canonical': product_teams},
     )
-    
-    return trend_df
+
+    trend_df = pd.concat([product_trend, other_trend], ignore_index=True)
+    return trend_df.sort_values(['Period', 'Team name'], ignore_index=True)
 
 # -----------------------
 # Main UI
@@ -578,29 +475,22 @@ def show_recognition_team_tab():
             selected_team = None
 
     # -------- Split All Hands vs Kudos --------
-    nom_col = next((c for c in ['Nominated', 'Nominated In', 'NominatedIn'] if c in df.columns), None)
-    if nom_col:
-        nom_series = df[nom_col].astype(str)
-        mask_kudos = nom_series.str.contains("kudos", case=False, na=False)
-        mask_all = nom_series.str.contains("all", case=False, na=False) & ~mask_kudos
-        if not mask_all.any():
-            mask_all = ~mask_kudos
-        df_allhands = df[mask_all].copy()
-        df_kudos = df[mask_kudos].copy()
-    else:
-        df_allhands = df.copy()
-        df_kudos = df[df.apply(lambda row: any("kudos" in str(v).lower() for v in row), axis=1)].copy()
+    # As (where, where_not) filters for query_dataset; rows without a
+    # system count as All Hands when no row is marked All Hands
+    kudos_filter = ({'System': [SYSTEM_KUDOS]}, {})
+    allhands_filter = ({'System': [SYSTEM_ALL_HANDS]}, {})
+    if not (df['System'] == SYSTEM_ALL_HANDS).any():
+        allhands_filter = ({}, {'System': [SYSTEM_KUDOS]})
 
     # -------- KPIs --------
     display_team_level_kpis(
-        df_allhands, 
-        df_kudos,
+        allhands_filter,
+        kudos_filter,
         selected_years,
         team_mode,
         selected_team,
         top_team_count,
         freq_award_filter,
-        df
     )
 
     show_glossary(
@@ -614,7 +504,6 @@ def show_recognition_team_tab():
     st.subheader("Team Recognition Frequency (Selected Period)")
 
     freq_df = build_team_frequency_table(
-        df,
         selected_years,
         team_mode,
         selected_team,
@@ -731,8 +620,8 @@ def show_recognition_team_tab():
         key="team_period_select"
     )
     
-    trend_allhands = build_allhands_trend(df_allhands, selected_years, time_period)
-    if trend_allhands is not None and not trend_allhands.empty:
+    trend_allhands = build_allhands_trend(allhands_filter, selected_years, time_period)
+    if not trend_allhands.empty:
         st.markdown("#### All Hands – Total Team & Champion Awards")
         fig_allhands = px.line(
             trend_allhands, 
@@ -770,8 +659,8 @@ def show_recognition_team_tab():
             "Combined Team + Champion Awards over time per team. Use period filter to adjust granularity."
         )
     
-    trend_kudos = build_kudos_trend(df_kudos, selected_years, time_period, employee_team_map)
-    if trend_kudos is not None and not trend_kudos.empty:
+    trend_kudos = build_kudos_trend(kudos_filter, selected_years, time_period, employee_team_map)
+    if not trend_kudos.empty:
         st.markdown("#### Kudos Corner – Total Awards by Team")
         st.caption("*Product teams (Greenmath/Edgecore): All awards | Other teams: Team + Champion only*")
         fig_kudos = px.line(
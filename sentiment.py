@@ -0,0 +1,486 @@
+import os
+import re
+import sys
+import string
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+import numpy as np
+import pandas as pd
+import streamlit as st
+from snapshot_store import SNAPSHOT_DIR
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 💬 SENTIMENT SCORING
+# ---------------------------------------------------------
+# One VADER analyzer is built per process and shared by every session, so
+# the lexicon is read once instead of on every rerun. Texts are scored a
+# column at a time: each distinct text is scored once, and its compound
+# score is remembered for the life of the process, so a rerun over the
+# same comments does no scoring at all.
+#
+# Scores also outlive the process in an SQLite file keyed by a hash of
+# the normalised text and the lexicon version. Submitted comments rarely
+# change, so after a restart only new or edited comments reach the
+# analyzer. A new lexicon (or NLTK release) gets fresh keys, and its
+# texts are scored again.
+SENTIMENT_STORE = os.environ.get(
+    "RR_SENTIMENT_STORE", os.path.join(SNAPSHOT_DIR, "sentiment.sqlite")
+)
+_LOOKUP_BATCH = 500
+
+# NLTK is only imported when the first text is scored, and the lexicon
+# is never downloaded: it is read from RR_VADER_LEXICON (a local
+# vader_lexicon.txt), which defaults to the copy vendored beside this
+# module, else from an installed NLTK data package. ``start_preload``
+# warms the analyzer in the background when RR_SENTIMENT_PRELOAD is set.
+VADER_LEXICON = os.environ.get(
+    "RR_VADER_LEXICON", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vader_lexicon.txt")
+)
+NLTK_LEXICON = "sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"
+SENTIMENT_PRELOAD = os.environ.get("RR_SENTIMENT_PRELOAD", "0") == "1"
+
+# Batches of BULK_MIN_TEXTS or more new texts (a cold store, a new
+# lexicon) go through the vectorised scorer below, which is several
+# times faster than scoring text by text.
+#
+# The worker pool is for exact scoring from scripts (the benchmark
+# below): its workers start by importing the caller's main script, which
+# must sit behind a ``__main__`` guard, so the app never starts one. A
+# script asks for it with ``analyze(texts, parallel=True)``; batches
+# smaller than PARALLEL_MIN_TEXTS, or a single worker, stay in-process,
+# where the pool's start-up and pickling would cost more than they save.
+BULK_MIN_TEXTS = int(os.environ.get("RR_SENTIMENT_BULK_MIN", 2000))
+SENTIMENT_WORKERS = int(os.environ.get("RR_SENTIMENT_WORKERS", 0)) or os.cpu_count() or 1
+PARALLEL_MIN_TEXTS = int(os.environ.get("RR_SENTIMENT_PARALLEL_MIN", 2000))
+CHUNKS_PER_WORKER = 4
+
+_compound_memo: dict = {}
+_write_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+_worker_analyzer = None
+
+
+def read_lexicon() -> tuple[str, str]:
+    """``(text, source)`` of the lexicon to score with (never downloads)."""
+    if VADER_LEXICON and os.path.exists(VADER_LEXICON):
+        with open(VADER_LEXICON, encoding="utf-8", newline="") as f:
+            return f.read(), VADER_LEXICON
+    import nltk
+    try:
+        return nltk.data.load(NLTK_LEXICON, format="text"), NLTK_LEXICON
+    except LookupError:
+        raise LookupError(
+            f"VADER lexicon not found at {VADER_LEXICON!r} or in the NLTK data path; "
+            "set RR_VADER_LEXICON or run `python -m nltk.downloader vader_lexicon`"
+        ) from None
+
+
+def _new_analyzer():
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+    started = time.perf_counter()
+    text, source = read_lexicon()
+    # Built around the text we read: the constructor would load its own
+    # resource, and NLTK refuses to open files outside its data path
+    sia = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    sia.lexicon_file = text
+    sia.lexicon = sia.make_lex_dict()
+    sia.constants = VaderConstants()
+    log.info("Loaded VADER lexicon from %s in %.2fs", source, time.perf_counter() - started)
+    return sia
+
+
+@st.cache_resource(show_spinner=False)
+def get_analyzer():
+    """The process-wide VADER analyzer, built on first use."""
+    return _new_analyzer()
+
+
+@st.cache_resource(show_spinner=False)
+def lexicon_version() -> str:
+    """NLTK release and a hash of the lexicon the analyzer scores with."""
+    import nltk
+    digest = hashlib.sha1(get_analyzer().lexicon_file.encode()).hexdigest()[:12]
+    return f"{nltk.__version__}-{digest}"
+
+
+def preload():
+    """Load NLTK and the lexicon now instead of on the first scored text."""
+    try:
+        get_analyzer()
+        lexicon_version()
+    except (LookupError, ImportError) as exc:
+        log.warning("Sentiment preload failed: %s", exc)
+
+
+@st.cache_resource
+def start_preload() -> threading.Thread | None:
+    """Warm the analyzer in a background thread (once per process), if enabled."""
+    if not SENTIMENT_PRELOAD:
+        return None
+    thread = threading.Thread(target=preload, name="rr-sentiment-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def normalise_text(text) -> str:
+    """Text as it is scored: blank for missing, whitespace collapsed.
+
+    VADER splits on whitespace, so this never changes a score.
+    """
+    return "" if pd.isna(text) else " ".join(str(text).split())
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def to_index(compound):
+    """Rescale compound scores (-1 to +1) to a 0-100 index."""
+    return (np.asarray(compound, dtype=float) + 1) / 2 * 100
+
+
+# -----------------------
+# Persistent score store
+# -----------------------
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(SENTIMENT_STORE) or ".", exist_ok=True)
+    con = sqlite3.connect(SENTIMENT_STORE, timeout=30)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS scores (text_hash TEXT, lexicon TEXT, compound REAL, "
+        "PRIMARY KEY (text_hash, lexicon))"
+    )
+    return con
+
+
+def stored_scores(texts: list) -> dict:
+    """``{text: compound}`` for the texts the store already holds."""
+    if not SENTIMENT_STORE or not texts:
+        return {}
+    by_key = {text_key(t): t for t in texts}
+    keys, version, found = list(by_key), lexicon_version(), {}
+    try:
+        with closing(_connect()) as con:
+            for i in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[i:i + _LOOKUP_BATCH]
+                rows = con.execute(
+                    f"SELECT text_hash, compound FROM scores WHERE lexicon = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})", [version, *batch],
+                ).fetchall()
+                found.update((by_key[k], c) for k, c in rows)
+    except sqlite3.Error as exc:
+        log.warning("Ignoring unreadable sentiment store %s: %s", SENTIMENT_STORE, exc)
+    return found
+
+
+def store_scores(scores: dict):
+    """Add ``{text: compound}`` to the store."""
+    if not SENTIMENT_STORE or not scores:
+        return
+    version = lexicon_version()
+    rows = [(text_key(t), version, c) for t, c in scores.items()]
+    try:
+        with _write_lock, closing(_connect()) as con:
+            con.executemany("INSERT OR IGNORE INTO scores VALUES (?, ?, ?)", rows)
+            con.commit()
+    except sqlite3.Error as exc:
+        log.warning("Could not write sentiment store %s: %s", SENTIMENT_STORE, exc)
+
+
+# -----------------------
+# Parallel scoring
+# -----------------------
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = _new_analyzer()
+
+
+def _score_chunk(texts: list) -> list:
+    return [_worker_analyzer.polarity_scores(t)["compound"] for t in texts]
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The process-wide scoring pool, started on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Never forked: a fork of a multi-threaded process can inherit
+                # locks that another thread held at the time
+                methods = multiprocessing.get_all_start_methods()
+                method = "forkserver" if "forkserver" in methods else "spawn"
+                _pool = ProcessPoolExecutor(
+                    SENTIMENT_WORKERS, mp_context=multiprocessing.get_context(method),
+                    initializer=_init_worker,
+                )
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _score_serial(texts: list) -> list:
+    sia = get_analyzer()
+    return [sia.polarity_scores(t)["compound"] for t in texts]
+
+
+def _score_parallel(texts: list) -> list:
+    size = -(-len(texts) // (SENTIMENT_WORKERS * CHUNKS_PER_WORKER))
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+    try:
+        return [c for scores in get_pool().map(_score_chunk, chunks) for c in scores]
+    except BrokenProcessPool as exc:
+        log.warning("Sentiment pool failed (%s); scoring in-process", exc)
+        _reset_pool()
+        return _score_serial(texts)
+
+
+def analyze(texts: list, parallel: bool = False) -> list:
+    """Compound scores of non-blank, normalised texts, bypassing every cache.
+
+    Batches of BULK_MIN_TEXTS or more are scored by ``score_bulk``.
+    ``parallel=True`` scores batches worth splitting exactly in the
+    worker pool instead; only for scripts (see PARALLEL_MIN_TEXTS).
+    """
+    if parallel and SENTIMENT_WORKERS > 1 and len(texts) >= PARALLEL_MIN_TEXTS:
+        return _score_parallel(texts)
+    if len(texts) >= BULK_MIN_TEXTS:
+        return score_bulk(texts)
+    return _score_serial(texts)
+
+
+# -----------------------
+# Vectorised scoring
+# -----------------------
+# For bulk rescoring, ``vectorised_compound_scores`` applies VADER's rules
+# to the whole corpus at once: texts are tokenised together, tokens are
+# mapped to integer ids, and valence, capitals, boosters, negation,
+# "least", "but" and punctuation emphasis are array operations over ids
+# and neighbour offsets. It matches ``polarity_scores`` to within
+# VECTORISED_TOLERANCE (one unit of its 4-decimal rounding), except for
+# texts using one of VADER's seven special-case idioms ("the bomb",
+# "yeah right", ...), which it scores like ordinary words.
+VECTORISED_TOLERANCE = 1e-4
+_NEVER_BOOSTS = {"so", "this"}
+_BOOSTER_BIGRAMS = {("just", "enough"), ("kind", "of"), ("sort", "of")}
+
+
+def _idiom_pattern(constants) -> str:
+    return "|".join(re.escape(idiom) for idiom in constants.SPECIAL_CASE_IDIOMS)
+
+
+def _affix_pattern(constants) -> str:
+    """Regex for one PUNC_LIST item before or after a punctuation-free word."""
+    punc = "|".join(re.escape(p) for p in sorted(constants.PUNC_LIST, key=len, reverse=True))
+    word = f"[^{re.escape(string.punctuation)}]{{2,}}"
+    return f"^(?:{punc})({word})$|^({word})(?:{punc})$"
+
+
+def vectorised_compound_scores(texts) -> np.ndarray:
+    """VADER compound scores for a corpus, computed with array operations.
+
+    Blank texts are NaN, as in ``compound_scores``; nothing is cached.
+    """
+    sia = get_analyzer()
+    c = sia.constants
+    cleaned = pd.Series(texts, dtype=object).map(normalise_text).reset_index(drop=True)
+    scores = np.zeros(len(cleaned))
+
+    # Tokenise like SentiText: whitespace split, drop 1-char tokens, strip
+    # one leading or trailing punctuation mark off plain words. Tokens are
+    # mapped to integer ids first, so the string work is done per distinct
+    # token rather than per occurrence.
+    tokens = cleaned.str.split().explode().dropna()
+    raw_codes, raw_vocab = pd.factorize(tokens.to_numpy(dtype=object))
+    raw_vocab = pd.Index(raw_vocab, dtype=object)
+    keep = np.asarray(raw_vocab.str.len() > 1, dtype=bool)[raw_codes]
+    vocab_codes, vocab = pd.factorize(raw_vocab.str.replace(_affix_pattern(c), r"\1\2", regex=True))
+    if keep.any():
+        doc = tokens.index.to_numpy()[keep]
+        codes = vocab_codes[raw_codes[keep]]
+        n = len(doc)
+        idx = np.arange(n)
+        starts = np.r_[0, np.flatnonzero(np.diff(doc)) + 1]
+        pos = idx - np.repeat(starts, np.diff(np.r_[starts, n]))
+
+        # Exact tokens, then their lower-case forms
+        vocab = pd.Index(vocab, dtype=object)
+        lower_codes, lower_vocab = pd.factorize(vocab.str.lower())
+        lower = pd.Index(lower_vocab, dtype=object)
+        lex_val = lower.map(lambda w: sia.lexicon.get(w, np.nan)).to_numpy(dtype=float)
+
+        def by_lower(values):
+            return np.asarray(values)[lower_codes][codes]
+
+        in_lex = by_lower(~np.isnan(lex_val))
+        valence = by_lower(np.nan_to_num(lex_val))
+        booster = by_lower(lower.map(lambda w: c.BOOSTER_DICT.get(w, 0.0)).to_numpy(dtype=float))
+        is_booster = by_lower(lower.isin(list(c.BOOSTER_DICT)))
+        negated = by_lower(lower.isin(list(c.NEGATE)) | lower.str.contains("n't", regex=False))
+        is_lower = {w: by_lower(lower == w) for w in ("least", "at", "very", "but", "kind", "of")}
+        upper = np.asarray(vocab.str.isupper(), dtype=bool)[codes]
+        is_never = np.asarray(vocab == "never")[codes]
+        never_boost = np.asarray(vocab.isin(list(_NEVER_BOOSTS)))[codes]
+        bigram_first = {w: np.asarray(vocab == w)[codes] for w, _ in _BOOSTER_BIGRAMS}
+        bigram_second = {w: np.asarray(vocab == w)[codes] for _, w in _BOOSTER_BIGRAMS}
+
+        n_upper = np.bincount(doc, weights=upper, minlength=len(cleaned))
+        n_tokens = np.bincount(doc, minlength=len(cleaned))
+        cap_diff = ((n_upper > 0) & (n_upper < n_tokens))[doc]
+
+        def prev(k):
+            return np.maximum(idx - k, 0)
+
+        # Valence of lexicon words, shaped by up to three preceding words
+        v = np.where(upper & cap_diff, np.where(valence > 0, valence + c.C_INCR, valence - c.C_INCR), valence)
+        for k, damp in ((1, 1.0), (2, 0.95), (3, 0.9)):
+            p = prev(k)
+            applies = (pos >= k) & ~in_lex[p]
+            s = np.where(v < 0, -booster[p], booster[p])
+            caps = is_booster[p] & upper[p] & cap_diff
+            s = np.where(caps, np.where(v > 0, s + c.C_INCR, s - c.C_INCR), s) * damp
+            v = np.where(applies, v + s, v)
+            if k == 1:
+                factor = np.where(negated[p], c.N_SCALAR, 1.0)
+            elif k == 2:
+                factor = np.where(is_never[p] & never_boost[prev(1)], 1.5,
+                                  np.where(negated[p], c.N_SCALAR, 1.0))
+            else:
+                boost = (is_never[p] & never_boost[prev(2)]) | never_boost[prev(1)]
+                factor = np.where(boost, 1.25, np.where(negated[p], c.N_SCALAR, 1.0))
+            v = np.where(applies, v * factor, v)
+        p3, p2, p1 = prev(3), prev(2), prev(1)
+        bigram = np.zeros(n, dtype=bool)
+        for first, second in _BOOSTER_BIGRAMS:
+            bigram |= bigram_first[first][p3] & bigram_second[second][p2]
+            bigram |= bigram_first[first][p2] & bigram_second[second][p1]
+        v = np.where((pos >= 3) & ~in_lex[p3] & bigram, v + c.B_DECR, v)
+        least = ~in_lex[p1] & is_lower["least"][p1] & (
+            (pos == 1) | ((pos > 1) & ~(is_lower["at"][p2] | is_lower["very"][p2]))
+        )
+        v = np.where((pos >= 1) & least, v * c.N_SCALAR, v)
+
+        # Boosters and "kind of" carry no valence of their own
+        nxt = np.minimum(idx + 1, n - 1)
+        kind_of = is_lower["kind"] & is_lower["of"][nxt] & (nxt > idx) & (doc[nxt] == doc)
+        v = np.where(in_lex & ~is_booster & ~kind_of, v, 0.0)
+
+        # VADER scores a repeated token in the context of its first occurrence
+        first = pd.Series(idx).groupby([doc, codes]).transform("first").to_numpy()
+        v = v[first]
+
+        # Words before the first "but" count half, words after it 1.5 times
+        but_pos = np.full(len(cleaned), np.iinfo(np.int64).max)
+        np.minimum.at(but_pos, doc[is_lower["but"]], pos[is_lower["but"]])
+        has_but = but_pos[doc] < np.iinfo(np.int64).max
+        v = np.where(has_but & (pos < but_pos[doc]), v * 0.5,
+                     np.where(has_but & (pos > but_pos[doc]), v * 1.5, v))
+        scores = np.bincount(doc, weights=v, minlength=len(cleaned))
+
+    # Punctuation emphasis and normalisation
+    ep = np.minimum(cleaned.str.count("!").to_numpy(), 4) * 0.292
+    qm = cleaned.str.count(r"\?").to_numpy()
+    amp = ep + np.where(qm > 1, np.where(qm <= 3, qm * 0.18, 0.96), 0.0)
+    scores = np.where(scores > 0, scores + amp, np.where(scores < 0, scores - amp, scores))
+    compound = np.round(scores / np.sqrt(scores * scores + 15), 4)
+    return np.where(cleaned.to_numpy() == "", np.nan, compound)
+
+
+def score_bulk(texts: list) -> list:
+    """Compound scores of non-blank, normalised texts, vectorised.
+
+    Texts using one of VADER's idioms are left to ``polarity_scores``,
+    so every score is VADER's to within VECTORISED_TOLERANCE.
+    """
+    texts = pd.Series(texts, dtype=object)
+    idioms = texts.str.lower().str.contains(_idiom_pattern(get_analyzer().constants)).to_numpy(dtype=bool)
+    scores = np.empty(len(texts))
+    scores[~idioms] = vectorised_compound_scores(texts[~idioms])
+    scores[idioms] = _score_serial(texts[idioms].tolist())
+    return scores.tolist()
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def benchmark(n_texts: int = 20_000, words: int = 12, seed: int = 0) -> pd.DataFrame:
+    """Speed and agreement of serial, parallel, vectorised and bulk scoring.
+
+    The synthetic corpus mixes lexicon words with boosters, negations,
+    "but", capitals and punctuation; differences are measured against
+    serial ``polarity_scores``.
+    """
+    rng = np.random.default_rng(seed)
+    c = get_analyzer().constants
+    vocab = np.array(
+        list(get_analyzer().lexicon) + list(c.BOOSTER_DICT) + list(c.NEGATE)
+        + ["the", "team", "award", "but", "least", "at", "never", "so", "this", "kind", "of"] * 20
+    )
+    texts = []
+    for _ in range(n_texts):
+        picked = rng.choice(vocab, words)
+        picked = [w.upper() if rng.random() < 0.05 else w for w in picked]
+        texts.append(" ".join(picked) + rng.choice(["", ".", "!", "!!", " ??", ",", " :)"]))
+    if SENTIMENT_WORKERS > 1:
+        get_pool().map(_score_chunk, [texts[:1]] * SENTIMENT_WORKERS)  # warm the workers
+    modes = [("serial", _score_serial)]
+    if SENTIMENT_WORKERS > 1:
+        modes.append(("parallel", _score_parallel))
+    modes += [("vectorised", vectorised_compound_scores), ("bulk", score_bulk)]
+    rows, baseline = [], None
+    for mode, score in modes:
+        started = time.perf_counter()
+        scores = np.asarray(score(texts), dtype=float)
+        seconds = time.perf_counter() - started
+        baseline = scores if baseline is None else baseline
+        diff = np.abs(scores - baseline)
+        rows.append({
+            "Mode": mode, "Texts": n_texts, "Seconds": round(seconds, 3),
+            "Texts/s": round(n_texts / seconds), "Max |diff|": round(float(diff.max()), 4),
+            "Within tolerance %": round(100 * float((diff <= VECTORISED_TOLERANCE + 1e-9).mean()), 2),
+        })
+    return pd.DataFrame(rows)
+
+
+# -----------------------
+# Batch scoring
+# -----------------------
+def compound_scores(texts) -> np.ndarray:
+    """VADER compound score of every text, in order (NaN for blank texts)."""
+    cleaned = pd.Series(texts, dtype=object).map(normalise_text)
+    missing = [t for t in pd.unique(cleaned) if t and t not in _compound_memo]
+    if missing:
+        known = stored_scores(missing)
+        todo = [t for t in missing if t not in known]
+        fresh = dict(zip(todo, analyze(todo)))
+        store_scores(fresh)
+        _compound_memo.update(known)
+        _compound_memo.update(fresh)
+        if fresh:
+            log.info("Scored %d new texts (%d from the sentiment store)", len(fresh), len(known))
+    return cleaned.map(lambda t: _compound_memo.get(t, np.nan) if t else np.nan).to_numpy(dtype=float)
+
+
+def score_texts(texts) -> tuple[np.ndarray, np.ndarray]:
+    """``(compound, index)`` arrays for a batch of texts; blanks are NaN in both."""
+    compound = compound_scores(texts)
+    return compound, to_index(compound)
+
+
+# Speed and accuracy report: python sentiment.py [n_texts]
+if __name__ == "__main__":
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000).to_string(index=False))
@@ -0,0 +1,498 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from data_sources import normalise_missing, forget_validators, forget_on_error, NotModified
+from ingest import row_fingerprints
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# 💾 ON-DISK SNAPSHOTS
+# ---------------------------------------------------------
+# Cleaned frames are written to ``<RR_SNAPSHOT_DIR>/<name>.parquet`` with
+# a small JSON sidecar holding the content hash and timestamps. A
+# snapshot younger than the TTL is served straight from disk; an older
+# one is rebuilt from the source, and if the source cannot be reached
+# the last good snapshot is served instead.
+SNAPSHOT_DIR = os.environ.get("RR_SNAPSHOT_DIR", ".rr_snapshots")
+SNAPSHOT_TTL_SECONDS = int(os.environ.get("RR_SNAPSHOT_TTL", 600))
+# Next to the Parquet file each snapshot is also written as an
+# uncompressed Arrow IPC file (``<name>.arrow``). Processes load it
+# through a read-only memory map: numeric, datetime and categorical-code
+# columns then point straight into the page cache, which every
+# Streamlit replica on the host shares, instead of each holding a
+# private copy. The file is only ever replaced (never rewritten in
+# place), so a process still mapping an older version keeps a valid view.
+SNAPSHOT_MMAP = os.environ.get("RR_SNAPSHOT_MMAP", "1") != "0"
+# Every new version is also recorded in ``<name>.history/`` as a delta
+# against the one before it, so past states can be rebuilt on demand.
+# Every SNAPSHOT_KEYFRAME versions a full copy bounds the replay length.
+SNAPSHOT_HISTORY = os.environ.get("RR_SNAPSHOT_HISTORY", "1") != "0"
+SNAPSHOT_KEYFRAME = int(os.environ.get("RR_SNAPSHOT_KEYFRAME", 24))
+
+_history_lock = threading.Lock()
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    """Stable hash of a frame's columns, dtypes and values (not its index)."""
+    h = hashlib.sha1()
+    h.update("|".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items()).encode())
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def _paths(name: str) -> tuple[str, str]:
+    base = os.path.join(SNAPSHOT_DIR, name)
+    return base + ".parquet", base + ".json"
+
+
+def _arrow_path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, name) + ".arrow"
+
+
+def _temp_name(path: str, suffix: str) -> str:
+    # Unique per thread: a cold-start load and the background refresh
+    # can write the same snapshot at once.
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.{suffix}"
+
+
+def _write_atomic(path: str, write_fn):
+    tmp = _temp_name(path, "tmp")
+    write_fn(tmp)
+    os.replace(tmp, path)
+
+
+def _write_parquet(df: pd.DataFrame, path: str):
+    try:
+        df.to_parquet(path, index=False)
+    except (ValueError, TypeError):
+        # Mixed-type object columns (common in XLSX exports) cannot be
+        # written as-is; store their values as text instead.
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+        df.to_parquet(path, index=False)
+
+
+def _write_arrow(df: pd.DataFrame, path: str, digest: str):
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    # The content hash travels with the file so a reader can tell it
+    # matches the JSON sidecar.
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"rr_hash": digest.encode()})
+    with pa.OSFile(path, "wb") as sink:
+        # One record batch keeps every column contiguous, hence mappable as-is
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(df), 1))
+
+
+def read_shared(name: str, meta: dict | None) -> pd.DataFrame | None:
+    """Map the Arrow copy of a snapshot, or None if it is missing or outdated."""
+    path = _arrow_path(name)
+    if not SNAPSHOT_MMAP or not meta or not os.path.exists(path):
+        return None
+    try:
+        import pyarrow as pa
+
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        if (reader.schema.metadata or {}).get(b"rr_hash") != meta.get("hash", "").encode():
+            return None
+        df = reader.read_all().to_pandas(split_blocks=True)
+    except Exception as exc:
+        log.warning("Ignoring unreadable shared snapshot %s: %s", path, exc)
+        return None
+    return normalise_missing(df)
+
+
+def _sorted_categories(series: pd.Series) -> pd.Series:
+    """Categories in sorted order, as ``astype("category")`` produces them."""
+    try:
+        return series.cat.reorder_categories(series.cat.categories.sort_values())
+    except TypeError:  # mixed-type categories cannot be sorted
+        return series
+
+
+def _categorical_columns(schema) -> list:
+    """Columns that pandas wrote as categoricals, per the file's metadata."""
+    meta = schema.pandas_metadata or {}
+    return [c["name"] for c in meta.get("columns", [])
+            if c.get("pandas_type") == "categorical" and c["name"] in schema.names]
+
+
+def _text_table(df: pd.DataFrame):
+    """Arrow table for one chunk with categoricals and all-null columns as text.
+
+    Chunks are typed independently, so dictionaries and inferred types
+    differ between them; plain strings give every chunk the same schema.
+    """
+    import pyarrow as pa
+
+    df = df.copy(deep=False)
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type) or pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table
+
+
+def stream_to_snapshot(name: str, chunks, transform) -> pd.DataFrame:
+    """Clean ``chunks`` one at a time into a staged Parquet file.
+
+    Only one raw chunk is in memory at a time. ``transform`` cleans and
+    types a chunk; its categorical columns are read back as categoricals
+    straight from the file's dictionary pages, so the full frame never
+    exists as Python strings. ``save_snapshot`` then adopts the staged
+    file instead of writing the frame again.
+    """
+    import pyarrow.parquet as pq
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    data_path, _ = _paths(name)
+    staged = _temp_name(data_path, "staged")
+    writer, schema, categorical = None, None, []
+    try:
+        for chunk in chunks:
+            chunk = transform(chunk)
+            table = _text_table(chunk)
+            if writer is None:
+                schema = table.schema
+                categorical = [c for c in chunk.columns
+                               if isinstance(chunk[c].dtype, pd.CategoricalDtype)]
+                writer = pq.ParquetWriter(staged, schema)
+            writer.write_table(table.cast(schema))
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(staged):
+            os.remove(staged)
+        raise
+    if writer is None:
+        return pd.DataFrame()
+    writer.close()
+
+    # Read back one column at a time so the Arrow copy of the whole file
+    # and the pandas frame never coexist.
+    staged_file = pq.ParquetFile(staged, read_dictionary=categorical)
+    columns = {}
+    for col in schema.names:
+        part = staged_file.read(columns=[col], use_pandas_metadata=True).to_pandas()
+        series = part[col]
+        if col in categorical:
+            # Dictionaries come back in first-seen order; match astype("category")
+            series = _sorted_categories(series)
+        elif series.dtype == object:
+            series = series.fillna(np.nan)
+        columns[col] = series
+        del part
+    staged_file.close()
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs["staged_parquet"] = staged
+    return df
+
+
+def read_meta(name: str) -> dict | None:
+    _, meta_path = _paths(name)
+    try:
+        with open(meta_path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(name: str, meta: dict):
+    _, meta_path = _paths(name)
+
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=1)
+
+    _write_atomic(meta_path, write)
+
+
+def read_snapshot(name: str) -> tuple[pd.DataFrame | None, dict | None]:
+    """Return the stored frame and its metadata, or (None, None)."""
+    data_path, _ = _paths(name)
+    meta = read_meta(name)
+    if meta is None or not os.path.exists(data_path):
+        return None, None
+    shared = read_shared(name, meta)
+    if shared is not None:
+        return shared, meta
+    try:
+        df = _read_parquet(data_path)
+    except Exception as exc:
+        log.warning("Ignoring unreadable snapshot %s: %s", data_path, exc)
+        return None, None
+    return normalise_missing(df), meta
+
+
+def _read_parquet(path: str) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+
+    # Chunked snapshots store categoricals as plain strings; the pandas
+    # metadata still says which columns they were.
+    categorical = _categorical_columns(pq.read_schema(path))
+    df = pq.read_table(path, read_dictionary=categorical).to_pandas()
+    for col in categorical:
+        df[col] = _sorted_categories(df[col])
+    return df
+
+
+def save_snapshot(name: str, df: pd.DataFrame, previous: dict | None = None) -> dict:
+    """Persist ``df`` unless its content hash matches ``previous``."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    now = time.time()
+    digest = content_hash(df)
+    staged = df.attrs.pop("staged_parquet", None)
+    data_path, _ = _paths(name)
+    if not (previous and previous.get("hash") == digest):
+        # Another process may already have stored this exact version;
+        # keeping its files lets both map the same Arrow file.
+        on_disk = read_meta(name)
+        if on_disk and on_disk.get("hash") == digest and os.path.exists(data_path):
+            previous = on_disk
+    if previous and previous.get("hash") == digest:
+        meta = _confirmed(previous, now)
+        if staged and os.path.exists(staged):
+            os.remove(staged)
+    else:
+        if staged and os.path.exists(staged):
+            os.replace(staged, data_path)
+        else:
+            _write_atomic(data_path, lambda tmp: _write_parquet(df, tmp))
+        meta = {
+            "name": name,
+            "hash": digest,
+            "rows": int(len(df)),
+            "saved_at": now,
+            "checked_at": now,
+        }
+    arrow_path = _arrow_path(name)
+    if SNAPSHOT_MMAP and (meta["saved_at"] == now or not os.path.exists(arrow_path)):
+        _write_atomic(arrow_path, lambda tmp: _write_arrow(df, tmp, digest))
+    _write_meta(name, meta)
+    return meta
+
+
+def _confirmed(meta: dict, now: float) -> dict:
+    meta = {k: v for k, v in meta.items() if k not in ("stale", "error")}
+    meta["checked_at"] = now
+    return meta
+
+
+def touch_snapshot(name: str, meta: dict) -> dict:
+    """Record that the source was checked and found unchanged."""
+    meta = _confirmed(meta, time.time())
+    _write_meta(name, meta)
+    return meta
+
+
+def snapshot_age(meta: dict | None) -> float:
+    """Seconds since the source was last checked (inf when unknown)."""
+    if not meta:
+        return float("inf")
+    return time.time() - meta.get("checked_at", 0)
+
+
+# -----------------------
+# Version history
+# -----------------------
+# ``<name>.history/index.json`` lists every recorded version (content
+# hash, save time, row count). Version ``seq`` stores the rows that are
+# new since ``seq - 1`` in ``<seq>.parquet`` and the rows it dropped in
+# ``<seq>.removed.parquet``. Rows are matched by a fingerprint of the
+# whole stored row (VERSION_FP_COL), so a refresh that only changes
+# cleaned values, e.g. a newly approved alias, shows up as edits. An
+# edited row is a removal plus an addition. Added rows also record their
+# position (VERSION_POS_COL), so replaying a delta rebuilds the version
+# in the same row order and with the same content hash. A keyframe also
+# stores every row in ``<seq>.full.parquet``. So does any version whose
+# predecessor is unknown, or whose kept rows moved relative to each other.
+# Replaying deltas from the last keyframe rebuilds any version.
+VERSION_FP_COL = "_version_fp"
+VERSION_POS_COL = "_version_pos"
+HISTORY_FORMAT = 2
+
+
+def _history_dir(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, name) + ".history"
+
+
+def _history_path(name: str, seq: int, part: str) -> str:
+    return os.path.join(_history_dir(name), f"{seq:05d}{part}.parquet")
+
+
+def list_versions(name: str) -> list[dict]:
+    """Recorded versions of a dataset, oldest first."""
+    try:
+        with open(os.path.join(_history_dir(name), "index.json"), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return []
+
+
+def _drop_history_columns(df: pd.DataFrame) -> pd.DataFrame:
+    return df.drop(columns=[VERSION_FP_COL, VERSION_POS_COL], errors="ignore")
+
+
+def record_version(name: str, df: pd.DataFrame, meta: dict, previous: tuple | None = None):
+    """Add ``df`` to the history unless it is already the latest version.
+
+    ``previous`` is the ``(frame, meta)`` version it replaces; the new
+    one is stored as a delta against it when that is the last recorded
+    version, and in full otherwise.
+    """
+    if not SNAPSHOT_HISTORY or not meta or meta.get("stale"):
+        return
+    with _history_lock:
+        _record_version(name, df, meta, previous)
+
+
+def _record_version(name: str, df: pd.DataFrame, meta: dict, previous: tuple | None):
+    versions = list_versions(name)
+    last = versions[-1] if versions else None
+    if last and last["hash"] == meta["hash"]:
+        return
+    seq = last["seq"] + 1 if last else 0
+    fps = row_fingerprints(df)
+    delta = bool(previous and previous[0] is not None and last
+                 and last["hash"] == (previous[1] or {}).get("hash")
+                 and last.get("format") == HISTORY_FORMAT)
+    keyframe = next((v["seq"] for v in reversed(versions) if v["keyframe"]), None)
+    is_keyframe = not delta or keyframe is None or seq - keyframe >= SNAPSHOT_KEYFRAME
+
+    os.makedirs(_history_dir(name), exist_ok=True)
+    entry = {
+        "seq": seq, "hash": meta["hash"], "saved_at": meta.get("saved_at", time.time()),
+        "rows": int(len(df)), "delta": delta, "added": None, "removed": None,
+        "keyframe": is_keyframe, "format": HISTORY_FORMAT,
+    }
+    if delta:
+        before = previous[0]
+        before_fps = row_fingerprints(before)
+        added = ~np.isin(fps, before_fps)
+        removed = ~np.isin(before_fps, fps)
+        if not np.array_equal(fps[~added], before_fps[~removed]):
+            entry["keyframe"] = is_keyframe = True  # kept rows were reordered
+        added_rows = df[added].assign(
+            **{VERSION_FP_COL: fps[added], VERSION_POS_COL: np.flatnonzero(added)}
+        )
+        removed_rows = before[removed].assign(**{VERSION_FP_COL: before_fps[removed]})
+        for part, rows in (("", added_rows), (".removed", removed_rows)):
+            _write_atomic(_history_path(name, seq, part), lambda tmp: _write_parquet(rows, tmp))
+        entry.update(added=int(added.sum()), removed=int(removed.sum()))
+    if is_keyframe:
+        full = df.assign(**{VERSION_FP_COL: fps})
+        _write_atomic(_history_path(name, seq, ".full"), lambda tmp: _write_parquet(full, tmp))
+    versions.append(entry)
+
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(versions, fh, indent=1)
+
+    _write_atomic(os.path.join(_history_dir(name), "index.json"), write)
+
+
+def read_changes(name: str, seq: int) -> tuple[pd.DataFrame, pd.DataFrame] | None:
+    """``(added, removed)`` rows of version ``seq``, None if it has no delta."""
+    entry = next((v for v in list_versions(name) if v["seq"] == seq), None)
+    if not entry or not entry["delta"] or entry.get("format") != HISTORY_FORMAT:
+        return None
+    return tuple(normalise_missing(_drop_history_columns(_read_parquet(_history_path(name, seq, part))))
+                 for part in ("", ".removed"))
+
+
+def read_version(name: str, seq: int) -> tuple[pd.DataFrame, dict]:
+    """Rebuild version ``seq`` of a dataset from its history."""
+    versions = [v for v in list_versions(name) if v["seq"] <= seq]
+    if not versions or versions[-1]["seq"] != seq:
+        raise KeyError(f"No version {seq} of '{name}' in the history")
+    start = max(i for i, v in enumerate(versions) if v["keyframe"])
+    if versions[start].get("format") != HISTORY_FORMAT:
+        raise KeyError(f"Version {seq} of '{name}' was recorded in an older history format")
+    df = _read_parquet(_history_path(name, versions[start]["seq"], ".full"))
+    categorical = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    for v in versions[start + 1:]:
+        if v["removed"]:
+            removed = pd.read_parquet(_history_path(name, v["seq"], ".removed"),
+                                      columns=[VERSION_FP_COL])[VERSION_FP_COL]
+            df = df[~df[VERSION_FP_COL].isin(removed)]
+        if v["added"]:
+            added = _read_parquet(_history_path(name, v["seq"], ""))
+            # Kept rows keep their order; added rows go back to their positions
+            at = np.zeros(len(df) + len(added), dtype=bool)
+            at[added[VERSION_POS_COL].to_numpy()] = True
+            order = np.empty(len(at), dtype=np.int64)
+            order[~at] = np.arange(len(df))
+            order[at] = len(df) + np.arange(len(added))
+            df = pd.concat([df, added.drop(columns=VERSION_POS_COL)], ignore_index=True).iloc[order]
+    df = _drop_history_columns(df).reset_index(drop=True)
+    for col in categorical:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Parts with different categories concatenate as objects
+            df[col] = df[col].astype("category")
+    entry = versions[-1]
+    meta = {
+        "name": name, "hash": entry["hash"], "rows": entry["rows"],
+        "saved_at": entry["saved_at"], "checked_at": entry["saved_at"], "as_of": seq,
+    }
+    return normalise_missing(df), meta
+
+
+def load_or_build(name: str, build_fn, ttl: float | None = None, force: bool = False,
+                  current: tuple | None = None):
+    """Return ``(df, meta)`` for a snapshot, rebuilding it when expired.
+
+    ``build_fn(previous)`` fetches and cleans the dataset; ``previous``
+    is the frame held so far (or None), which lets a builder ingest only
+    what changed. When it fails and an
+    older snapshot exists, that snapshot is returned with ``stale`` set
+    in its metadata; without a snapshot the error propagates. If the
+    source reports ``NotModified`` the snapshot is kept and only its
+    check time moves. ``current`` is the caller's in-memory version,
+    used in place of the on-disk copy so a refresh skips the Parquet read.
+    """
+    ttl = SNAPSHOT_TTL_SECONDS if ttl is None else ttl
+    df, meta = current if current is not None else read_snapshot(name)
+    if df is not None and not force and snapshot_age(meta) < ttl:
+        record_version(name, df, meta)
+        return df, meta
+
+    try:
+        try:
+            with forget_on_error():
+                fresh = build_fn(df)
+        except NotModified:
+            if df is not None:
+                return df, touch_snapshot(name, meta)
+            # No copy of the unchanged data is held here: fetch it in full
+            forget_validators()
+            with forget_on_error():
+                fresh = build_fn(None)
+    except Exception as exc:
+        if df is None:
+            raise
+        log.warning("Serving last good '%s' snapshot; refresh failed: %s", name, exc)
+        return df, dict(meta, stale=True, error=str(exc))
+
+    previous = (df, meta)
+    meta = save_snapshot(name, fresh, previous=meta)
+    record_version(name, fresh, meta, previous=previous)
+    # Swap the private frame for the memory-mapped one other processes share
+    shared = read_shared(name, meta)
+    return (fresh if shared is None else shared), meta
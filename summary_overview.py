@@ -7,10 +7,10 @@ import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from nltk.sentiment import SentimentIntensityAnalyzer
-import nltk
 from collections import Counter
 from io import BytesIO
+from survey_data import get_survey
+from sentiment import score_texts
 
 
 
@@ -31,14 +31,6 @@ except Exception:
 
 
 
-# Ensure VADER is present
-try:
-    nltk.data.find("sentiment/vader_lexicon.zip")
-except LookupError:
-    nltk.download("vader_lexicon")
-
-
-
 # WordCloud availability
 _WORDCLOUD_OK = True
 try:
@@ -117,16 +109,8 @@ COLS = {
 
 
 # ================= LOAD SURVEY =================
-@st.cache_data
 def load_survey_data():
-    sheet_key = "1KSuP5YlzyI1jdVTMMu5v7MLyzvP9Emr3Fo94BsiSFo0"
-    df = pd.read_csv(
-        f"https://docs.google.com/spreadsheets/d/{sheet_key}/export?format=csv",
-        on_bad_lines="skip",
-        encoding="utf-8"
-    )
-    df.columns = df.columns.str.strip().str.replace("\n", " ").str.replace("\r", "")
-    return df
+    return get_survey()
 
 
 
@@ -160,12 +144,9 @@ def earlier_rating_score(df: pd.DataFrame):
 
 
 def score_sentiment_texts(texts):
-    texts = [clean_text(t) for t in texts if clean_text(t)]
-    if not texts:
-        return np.nan
-    sia = SentimentIntensityAnalyzer()
-    vals = [(sia.polarity_scores(t)["compound"] + 1) / 2 * 100 for t in texts]
-    return float(np.mean(vals))
+    _, index = score_texts(texts)
+    index = index[~np.isnan(index)]
+    return float(index.mean()) if index.size else np.nan
 
 
 
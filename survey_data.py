@@ -0,0 +1,21 @@
+import pandas as pd
+from data_sources import read_source
+from datasets import register_dataset, get_dataset
+
+# ---------------------------------------------------------
+# 📝 SURVEY DATASET
+# ---------------------------------------------------------
+
+
+def fetch_survey_data(previous: pd.DataFrame | None = None) -> pd.DataFrame:
+    df = read_source("survey", on_bad_lines="skip", encoding="utf-8")
+    df.columns = df.columns.str.strip().str.replace("\n", " ").str.replace("\r", "")
+    return df
+
+
+register_dataset("survey", fetch_survey_data)
+
+
+def get_survey() -> pd.DataFrame:
+    """Return a read-only view of the current survey frame."""
+    return get_dataset("survey")[0].copy(deep=False)
@@ -0,0 +1,67 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+import streamlit as st
+
+# ---------------------------------------------------------
+# 🏢 TENANTS (BUSINESS UNITS)
+# ---------------------------------------------------------
+# One deployment can serve several business units, each with its own
+# survey and awards sheets. RR_TENANTS lists them (comma-separated); the
+# first is the one sessions start in. Every dataset, snapshot, store and
+# cache key is namespaced by tenant: dataset "awards" of tenant "ops" is
+# kept as "ops.awards", and its source is read from RR_OPS_AWARDS_SOURCE.
+# The tenant named "default" (the only one when RR_TENANTS is unset)
+# keeps the plain names, so a single-unit deployment is unchanged.
+#
+# Each tenant's in-memory datasets are held to a memory budget in MB
+# (RR_<TENANT>_MEMORY_MB, else RR_TENANT_MEMORY_MB; 0 means unlimited);
+# see ``datasets`` for the eviction rules.
+DEFAULT_TENANT = "default"
+TENANTS = [t.strip() for t in os.environ.get("RR_TENANTS", "").split(",") if t.strip()] \
+    or [DEFAULT_TENANT]
+TENANT_KEY = "tenant"
+
+_scope: ContextVar = ContextVar("rr_tenant", default=None)
+
+
+def tenant_budget_bytes(tenant: str) -> int:
+    """Memory budget of a tenant's datasets in bytes (0 for unlimited)."""
+    mb = os.environ.get(f"RR_{tenant.upper()}_MEMORY_MB", os.environ.get("RR_TENANT_MEMORY_MB", 0))
+    return int(float(mb) * 1_048_576)
+
+
+def current_tenant() -> str:
+    """The tenant in scope: set by ``tenant_scope``, else the session's choice."""
+    tenant = _scope.get()
+    if tenant is None:
+        try:
+            tenant = st.session_state.get(TENANT_KEY)
+        except Exception:  # no session outside a script run (background threads)
+            tenant = None
+    return tenant if tenant in TENANTS else TENANTS[0]
+
+
+@contextmanager
+def tenant_scope(tenant: str):
+    """Run loaders, hooks and stores for ``tenant`` (e.g. in a background thread)."""
+    token = _scope.set(tenant)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def qualified(name: str, tenant: str | None = None) -> str:
+    """Namespaced dataset name: ``name`` for the default tenant, else ``tenant.name``."""
+    tenant = current_tenant() if tenant is None else tenant
+    return name if tenant == DEFAULT_TENANT else f"{tenant}.{name}"
+
+
+def tenant_path(path: str, tenant: str | None = None) -> str:
+    """Per-tenant variant of a file path ("store.sqlite" -> "store.ops.sqlite")."""
+    tenant = current_tenant() if tenant is None else tenant
+    if not path or tenant == DEFAULT_TENANT:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{tenant}{ext}"
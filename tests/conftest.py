@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# Snapshots, alias tables and stores of the modules under test go to a
+# scratch directory; settings are read when the modules are imported.
+os.environ.setdefault("RR_SNAPSHOT_DIR", tempfile.mkdtemp(prefix="rr-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.fixture
+def fixture_path():
+    """Path of a file in ``tests/fixtures``."""
+    return lambda name: os.path.join(FIXTURES, name)
+
+
+class ExportServer:
+    """Local stand-in for the spreadsheet export endpoint.
+
+    Serves the files of ``root``; with ``etag`` it sends an ETag and
+    answers a matching If-None-Match with 304, without it the response
+    carries no validators at all. ``statuses`` lists the status codes
+    sent, in order.
+    """
+
+    def __init__(self, root: str, etag: bool):
+        self.root, self.etag, self.statuses = root, etag, []
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self):
+                path = os.path.join(server.root, self.path.lstrip("/").split("?")[0])
+                if not os.path.isfile(path):
+                    server.statuses.append(404)
+                    self.send_error(404)
+                    return
+                body = open(path, "rb").read()
+                tag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if server.etag and self.headers.get("If-None-Match") == tag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                server.statuses.append(200)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                if server.etag:
+                    self.send_header("ETag", tag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture(params=[True, False], ids=["etag", "no-validators"])
+def export_server(request, tmp_path):
+    """An ``ExportServer`` over a writable copy of the fixture files."""
+    root = tmp_path / "exports"
+    shutil.copytree(FIXTURES, root)
+    server = ExportServer(str(root), etag=request.param)
+    yield server
+    server.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_validators():
+    from http_fetch import forget_validators
+    forget_validators()
+    yield
+    forget_validators()
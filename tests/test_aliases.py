@@ -0,0 +1,32 @@
+import pandas as pd
+
+import awards_data
+import data_sources
+import entity_resolution
+import snapshot_store
+
+
+def test_approved_alias_applies_to_unchanged_export(export_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_sources, "GSHEET_EXPORT_URL", export_server.url + "/{key}")
+    monkeypatch.setenv("RR_AWARDS_SOURCE", "gsheet:awards.csv")
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(entity_resolution, "ALIAS_FILE", str(tmp_path / "aliases.csv"))
+    monkeypatch.setattr(awards_data, "_applied", {})
+
+    def refresh(current=None):
+        return snapshot_store.load_or_build("awards", awards_data.fetch_awards_data, ttl=0, current=current)
+
+    df, meta = refresh()
+    assert "Karthik" in set(df["Employee Name"])
+    assert refresh((df, meta))[1]["hash"] == meta["hash"]  # export unchanged: NotModified
+
+    table = entity_resolution.read_alias_table()
+    approved = pd.DataFrame([{"kind": "employee", "alias": "Karthik", "canonical": "Divya",
+                              "score": "0.5", "status": "approved"}])
+    pd.concat([table, approved]).to_csv(entity_resolution.alias_path(), index=False)
+
+    merged, merged_meta = refresh((df, meta))
+    assert merged_meta["hash"] != meta["hash"]
+    assert "Karthik" not in set(merged["Employee Name"])
+    assert (merged["Employee Name"] == "Divya").sum() == (
+        df["Employee Name"].isin(["Karthik", "Divya"])).sum()
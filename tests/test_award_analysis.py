@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import datasets
+import snapshot_store
+
+
+def _page():
+    from award_analysis import show_award_analysis
+    show_award_analysis()
+
+
+@pytest.mark.parametrize("dropped", [["Nominated In"], ["Award Title"], ["Nominated In", "Award Title"]])
+def test_page_renders_without_optional_columns(dropped, tmp_path, monkeypatch, fixture_path):
+    path = tmp_path / "awards.csv"
+    pd.read_csv(fixture_path("awards.csv")).drop(columns=dropped).to_csv(path, index=False)
+    monkeypatch.setenv("RR_AWARDS_SOURCE", f"csv:{path}")
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+    datasets.reset_datasets()
+
+    at = AppTest.from_function(_page, default_timeout=60).run()
+    datasets.reset_datasets()
+    assert not at.exception
+    filters = [m.label for m in at.multiselect]
+    assert ("Recognition System" in filters) == ("Nominated In" not in dropped)
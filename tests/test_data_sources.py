@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+import awards_data
+from data_sources import read_source, read_source_chunks, schema_report
+
+
+@pytest.fixture
+def shouted_export(tmp_path, monkeypatch, fixture_path):
+    """The fixture export with its headers in other cases and padded."""
+    raw = pd.read_csv(fixture_path("awards.csv"))
+    raw.columns = [f" {c.upper()} " if i % 2 else c.lower() for i, c in enumerate(raw.columns)]
+    path = tmp_path / "awards.csv"
+    raw.to_csv(path, index=False)
+    monkeypatch.setenv("RR_AWARDS_SOURCE", f"csv:{path}")
+    return raw
+
+
+@pytest.mark.parametrize("chunked", [False, True], ids=["whole", "chunked"])
+def test_headers_take_the_schema_spelling(shouted_export, chunked):
+    schema = awards_data.AWARDS_SCHEMA
+    if chunked:
+        df = pd.concat(read_source_chunks("awards", chunksize=64, schema=schema))
+    else:
+        df = read_source("awards", schema=schema)
+
+    assert list(df.columns) == schema.required + schema.optional
+    assert len(df) == len(shouted_export)
+    assert not schema_report("awards")["Status"].str.startswith("MISSING").any()
+
+
+def test_existing_spelling_is_not_duplicated():
+    schema = awards_data.AWARDS_SCHEMA
+    assert schema.spell(["Year", "year", " MONTH"]) == ["Year", "year", "Month"]
+
+
+def test_awards_load_from_differently_cased_export(shouted_export):
+    df = awards_data.fetch_awards_data(None)
+    assert len(df) == len(shouted_export)
+    assert df["year"].dtype == "Int16"
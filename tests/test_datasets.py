@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import datasets
+import snapshot_store
+
+
+@pytest.fixture
+def slow_dataset(tmp_path, monkeypatch):
+    """A registered dataset whose build takes a while and records overlaps."""
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(datasets, "_builders", {})
+    datasets.reset_datasets()
+    running, overlaps, builds = [0], [0], [0]
+    lock = threading.Lock()
+
+    def build(previous):
+        with lock:
+            running[0] += 1
+            overlaps[0] = max(overlaps[0], running[0])
+            builds[0] += 1
+        time.sleep(0.2)
+        with lock:
+            running[0] -= 1
+        return pd.DataFrame({"n": [builds[0]]})
+
+    datasets.register_dataset("slow", build)
+    yield overlaps, builds
+    datasets.reset_datasets()
+
+
+def test_load_and_refresh_never_build_together(slow_dataset):
+    overlaps, builds = slow_dataset
+    loader = threading.Thread(target=datasets.get_dataset, args=("slow",))
+    loader.start()
+    time.sleep(0.05)
+    datasets.refresh_dataset("slow")
+    loader.join()
+
+    assert builds[0] == 2
+    assert overlaps[0] == 1
+    assert datasets.get_dataset("slow")[0]["n"].tolist() == [2]
+
+
+def test_refresher_skips_a_dataset_being_loaded(slow_dataset):
+    builds = slow_dataset[1]
+    loader = threading.Thread(target=datasets.get_dataset, args=("slow",))
+    loader.start()
+    time.sleep(0.05)
+    datasets.refresh_all()
+    loader.join()
+
+    assert builds[0] == 1
+
+
+def test_budget_bookkeeping_stays_consistent_across_threads(monkeypatch):
+    datasets.reset_datasets()
+    frame = pd.DataFrame({"n": range(1000)})
+    size = int(frame.memory_usage(deep=True).sum())
+    monkeypatch.setattr(datasets, "MEMORY_BUDGET_BYTES", 5 * size)
+
+    errors = []
+
+    def load(worker):
+        try:
+            for i in range(200):
+                key = f"w{worker}-{i % 20}"
+                datasets._admit(key, (frame, {"hash": key}))
+                datasets._touch(key)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=load, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert set(datasets._current) == set(datasets._sizes) == set(datasets._last_used)
+    assert sum(datasets._sizes.values()) <= 5 * size
+    datasets.reset_datasets()
+
+
+def test_refresher_leaves_evicted_datasets_out_of_memory(slow_dataset):
+    builds = slow_dataset[1]
+    datasets.get_dataset("slow")
+    datasets.refresh_all()
+    assert builds[0] == 2
+
+    with datasets._budget_lock:
+        datasets._evict("slow")
+    datasets.refresh_all()
+    assert builds[0] == 2
+    assert "slow" not in datasets._current and "slow" not in datasets._sizes
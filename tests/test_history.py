@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot_store
+from ingest import FINGERPRINT_COL, row_fingerprints
+from snapshot_store import content_hash, record_version, read_version, read_changes, list_versions
+
+
+@pytest.fixture(autouse=True)
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_HISTORY", True)
+
+
+def _frame(names, years):
+    raw = pd.DataFrame({"Employee Name": names, "year": years})
+    df = raw.assign(**{"Employee Name": raw["Employee Name"].astype("category")})
+    df[FINGERPRINT_COL] = row_fingerprints(raw)
+    return df
+
+
+def _record(versions):
+    previous = None
+    for df in versions:
+        meta = {"hash": content_hash(df)}
+        record_version("awards", df, meta, previous=previous)
+        previous = (df, meta)
+
+
+def test_cleaned_value_changes_are_recorded_and_rebuilt():
+    v0 = _frame(["Jon Smith", "Asha Rao", "John Smith"], [2023, 2024, 2024])
+    # Same raw rows (same ingest fingerprints), but an alias now merges the names
+    v1 = v0.assign(**{"Employee Name": v0["Employee Name"].astype(str).replace("Jon Smith", "John Smith").astype("category")})
+    _record([v0, v1])
+
+    entry = list_versions("awards")[-1]
+    assert entry["delta"] and (entry["added"], entry["removed"]) == (1, 1)
+    added, removed = read_changes("awards", entry["seq"])
+    assert added["Employee Name"].tolist() == ["John Smith"]
+    assert removed["Employee Name"].tolist() == ["Jon Smith"]
+    for seq, expected in enumerate([v0, v1]):
+        df, meta = read_version("awards", seq)
+        assert content_hash(df) == meta["hash"] == content_hash(expected)
+
+
+def test_rebuilt_versions_keep_row_order():
+    v0 = _frame(["A", "B", "C", "D"], [2023, 2023, 2024, 2024])
+    v1 = _frame(["A", "X", "C", "D", "Y"], [2023, 2023, 2024, 2024, 2025])  # B edited, Y appended
+    v2 = _frame(["A", "X", "D", "Y", "Z"], [2023, 2023, 2024, 2025, 2025])  # C removed
+    _record([v0, v1, v2])
+
+    assert [v["keyframe"] for v in list_versions("awards")] == [True, False, False]
+    for seq, expected in enumerate([v0, v1, v2]):
+        df, meta = read_version("awards", seq)
+        assert df["Employee Name"].astype(str).tolist() == expected["Employee Name"].astype(str).tolist()
+        assert np.array_equal(df[FINGERPRINT_COL].to_numpy(), expected[FINGERPRINT_COL].to_numpy())
+        assert content_hash(df) == meta["hash"]
@@ -0,0 +1,71 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import awards_data
+import data_sources
+import snapshot_store
+from http_fetch import fetch_bytes, NotModified
+
+
+def _append_row(server, name):
+    path = os.path.join(server.root, name)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("2025,January,Alpha,New Starter,Spot Award,Spot on,Kudos,2025-01-15\n")
+
+
+def test_unchanged_export_is_not_modified(export_server):
+    url = f"{export_server.url}/awards.csv"
+    body = fetch_bytes(url)
+    assert len(pd.read_csv(io.BytesIO(body))) == 200
+
+    with pytest.raises(NotModified):
+        fetch_bytes(url)
+    # With an ETag the server answers 304; without validators the full
+    # body comes back and its hash shows nothing changed
+    assert export_server.statuses == [200, 304 if export_server.etag else 200]
+
+    _append_row(export_server, "awards.csv")
+    assert len(pd.read_csv(io.BytesIO(fetch_bytes(url)))) == 201
+    with pytest.raises(NotModified):
+        fetch_bytes(url)
+
+
+def test_unconditional_fetch_returns_body(export_server):
+    url = f"{export_server.url}/awards.xlsx"
+    first = fetch_bytes(url)
+    assert fetch_bytes(url, conditional=False) == first
+    assert len(pd.read_excel(io.BytesIO(first))) == 200
+
+
+def test_gsheet_backend_reads_from_stand_in(export_server, monkeypatch, fixture_path):
+    monkeypatch.setattr(data_sources, "GSHEET_EXPORT_URL", export_server.url + "/{key}")
+    monkeypatch.setenv("RR_AWARDS_SOURCE", "gsheet:awards.csv")
+    df = data_sources.read_source("awards")
+    pd.testing.assert_frame_equal(
+        df, data_sources.normalise_missing(pd.read_csv(fixture_path("awards.csv")))
+    )
+    with pytest.raises(NotModified):
+        data_sources.read_source("awards")
+
+
+def test_export_that_fails_to_build_stays_stale(export_server, monkeypatch, tmp_path):
+    monkeypatch.setattr(data_sources, "GSHEET_EXPORT_URL", export_server.url + "/{key}")
+    monkeypatch.setenv("RR_AWARDS_SOURCE", "gsheet:awards.csv")
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+
+    def refresh(current=None):
+        return snapshot_store.load_or_build("awards", awards_data.fetch_awards_data, ttl=0, current=current)
+
+    version = refresh()
+    path = os.path.join(export_server.root, "awards.csv")
+    pd.read_csv(path).drop(columns="Team name").to_csv(path, index=False)
+
+    for _ in range(2):
+        df, meta = refresh(version)
+        assert meta.get("stale") and "Team name" in meta["error"]
+        assert df is version[0]
+    # Two full downloads of the broken export, never a 304
+    assert export_server.statuses[-2:] == [200, 200]
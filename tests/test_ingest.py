@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import awards_data
+from ingest import FINGERPRINT_COL
+
+
+@pytest.fixture
+def awards_source(tmp_path, monkeypatch, fixture_path):
+    """Point the awards dataset at a writable copy of the fixture export."""
+    path = tmp_path / "awards.csv"
+    path.write_bytes(open(fixture_path("awards.csv"), "rb").read())
+    monkeypatch.setenv("RR_AWARDS_SOURCE", f"csv:{path}")
+    return path
+
+
+@pytest.mark.parametrize("year, month", [(2024, "March"), (2025, "January")])
+def test_refresh_cleans_only_appended_row(awards_source, monkeypatch, year, month):
+    previous = awards_data.fetch_awards_data(None)
+    raw = pd.read_csv(awards_source)
+    row = raw.iloc[[0]].assign(year=year, Month=month, **{"Employee Name": "New Starter"})
+    pd.concat([raw, row]).to_csv(awards_source, index=False)
+
+    cleaned = []
+    clean = awards_data.clean_award_rows
+
+    def counting_clean(df):
+        cleaned.append(len(df))
+        return clean(df)
+
+    monkeypatch.setattr(awards_data, "clean_award_rows", counting_clean)
+    current = awards_data.fetch_awards_data(previous)
+
+    assert cleaned == [1]
+    assert len(current) == len(previous) + 1
+    full = awards_data.fetch_awards_data(None)
+    pd.testing.assert_frame_equal(
+        current.drop(columns=FINGERPRINT_COL), full.drop(columns=FINGERPRINT_COL)
+    )
+
+
+def test_period_key_survives_small_int_years():
+    df = awards_data.compact_awards(pd.DataFrame({"year": [2024, None], "Month": ["March", "May"]}))
+    assert df["year"].dtype == "Int16"
+    assert awards_data.award_period_key(df).tolist() == [202403, -1]
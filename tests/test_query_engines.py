@@ -0,0 +1,102 @@
+import os
+
+import pandas as pd
+import pytest
+
+import awards_data
+import awards_query
+import awards_store
+from snapshot_store import content_hash
+
+ENGINES = [
+    "pandas",
+    pytest.param("duckdb", marks=pytest.mark.skipif(not awards_query.DUCKDB_OK, reason="duckdb not installed")),
+    pytest.param("polars", marks=pytest.mark.skipif(not awards_query.POLARS_OK, reason="polars not installed")),
+]
+
+YEARS = {"year": [2023, 2024]}
+TITLES = ["Team Award", "Spot Award", "Champion Award", "Awesome Award"]
+TEAM_STATS = {"Teams": ("Team_Canonical", "nunique"), "Awards": (None, "size")}
+KUDOS = {"System": ["Kudos Corner"]}
+
+# The requests the recognition pages send, with filters like theirs
+PAGE_QUERIES = {
+    "analysis-team-awards": dict(
+        by=["Team name"], where={**YEARS, "Team_Unknown": [False], "New_Award_title": ["Team Award"]}),
+    "analysis-award-counts": dict(
+        by=["New_Award_title"], where={**YEARS, "New_Award_title": TITLES, "Nominated In": ["Kudos"]}),
+    "analysis-treemap": dict(
+        by=["New_Award_title", "Team name"], where={**YEARS, "Team_Unknown": [False]},
+        measures={"Award Count": (None, "size")}),
+    "analysis-leaderboard": dict(
+        by=["Team name"], where={**YEARS, "Team_Unknown": [False], "Team name": ["Alpha", "Edgecore"]},
+        measures={"People_Count": ("Employee Name", "nunique"), "Award_Count": ("New_Award_title", "count")}),
+    "analysis-timeline": dict(
+        by=["Period_Q", "New_Award_title"], where={**YEARS, "New_Award_title": TITLES},
+        measures={"Award Count": (None, "size")}),
+    "individual-kpis": dict(
+        where_not={"New_Award_title": ["OTA Award"]},
+        measures={"Employees": ("Employee Name", "nunique"), "Awards": (None, "size")}),
+    "individual-per-employee": dict(
+        by=["Employee Name"], where_not={"New_Award_title": ["OTA Award"]},
+        measures={"Awards": ("New_Award_title", "count")}),
+    "individual-top": dict(
+        by=["Employee Name", "Team name"], measures={"Total Awards": ("New_Award_title", "count")}),
+    "individual-team-people": dict(
+        by=["Team name", "Employee Name"], measures={"Awards": ("New_Award_title", "count")}, dropna=False),
+    "team-total": dict(where={"year": [2024]}, measures=TEAM_STATS),
+    "team-top-teams": dict(by=["Team_Canonical"], where={"year": [2024], **KUDOS}),
+    "team-all-hands-monthly": dict(
+        by=["Period_M"], where=YEARS, where_not=KUDOS, measures=TEAM_STATS),
+    "team-frequency": dict(
+        by=["Team_Canonical", "New_Award_title", "Employee Name"], where=YEARS,
+        measures={"n": (None, "size")}, dropna=False),
+    "team-trend": dict(
+        by=["Period_M", "Team_Canonical"], where={"Team_Unknown": [False], **KUDOS, **YEARS},
+        measures={"Total_Awards": (None, "size")}),
+    "team-trend-excluding": dict(
+        by=["Period_Y", "Team name"], where_not={**KUDOS, "Team name": ["Unknown Team"]},
+        measures={"Total_Awards": (None, "size")}, dropna=False),
+}
+
+
+@pytest.fixture(scope="module")
+def awards(tmp_path_factory):
+    """The cleaned fixture export and the metadata the loader would give it."""
+    store_dir = tmp_path_factory.mktemp("query")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("RR_AWARDS_SOURCE", "csv:" + os.path.join(os.path.dirname(__file__), "fixtures", "awards.csv"))
+        df = awards_data.fetch_awards_data(None)
+    return df, {"hash": content_hash(df)}, str(store_dir / "awards.sqlite")
+
+
+def reference(df, query):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(awards_query, "QUERY_ENGINE", "pandas")
+        return awards_query.query_awards(df, **query)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("query", PAGE_QUERIES.values(), ids=PAGE_QUERIES.keys())
+def test_engines_agree(awards, monkeypatch, engine, query):
+    df = awards[0]
+    monkeypatch.setattr(awards_query, "QUERY_ENGINE", engine)
+    out = awards_query.query_awards(df, **query)
+    assert len(out)
+    pd.testing.assert_frame_equal(out, reference(df, query))
+
+
+@pytest.mark.parametrize("query", PAGE_QUERIES.values(), ids=PAGE_QUERIES.keys())
+def test_sqlite_store_agrees(awards, monkeypatch, query):
+    df, meta, path = awards
+    monkeypatch.setattr(awards_store, "SQLITE_STORE", path)
+    monkeypatch.setattr(awards_query, "get_dataset", lambda name: (df, meta))
+    awards_store.write_store(df, meta)
+    assert awards_store.store_ready(meta)
+    expected = reference(df, query)
+
+    def no_frame_query(*args, **kwargs):
+        raise AssertionError("answered from the frame, not the store")
+
+    monkeypatch.setattr(awards_query, "query_awards", no_frame_query)
+    pd.testing.assert_frame_equal(awards_query.query_dataset(**query), expected)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import sentiment
+
+pytest.importorskip("nltk")
+
+COMMENTS = [
+    "Great work on the release!!",
+    "The demo was NOT good, but the follow-up was excellent",
+    "She is kind of amazing at this",
+    "Never so happy to see a bug fixed ??",
+    "At least it shipped.",
+    "That launch was the bomb",
+    "Yeah right, like that will work",
+    "He can really cut the mustard :)",
+    "Thanks",
+]
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    words = np.array(list(sentiment.get_analyzer().lexicon)[:2000] + ["the", "team", "but", "very"] * 50)
+    texts = [" ".join(rng.choice(words, 10)) + rng.choice(["", "!", " ??"]) for _ in range(500)]
+    return [sentiment.normalise_text(t) for t in COMMENTS + texts]
+
+
+def test_bulk_scores_match_vader(corpus):
+    exact = np.array(sentiment._score_serial(corpus))
+    bulk = np.array(sentiment.score_bulk(corpus))
+    assert np.abs(bulk - exact).max() <= sentiment.VECTORISED_TOLERANCE + 1e-9
+    # Idioms are not modelled by the vectorised scorer; they are scored exactly
+    idioms = [i for i, t in enumerate(COMMENTS) if "bomb" in t or "right" in t or "mustard" in t]
+    assert bulk[idioms].tolist() == exact[idioms].tolist()
+
+
+def test_large_batches_never_start_the_pool(corpus, monkeypatch):
+    def no_pool():
+        raise AssertionError("the worker pool was started")
+
+    monkeypatch.setattr(sentiment, "get_pool", no_pool)
+    monkeypatch.setattr(sentiment, "BULK_MIN_TEXTS", 100)
+    scores = sentiment.analyze(corpus)
+    assert np.allclose(scores, sentiment._score_serial(corpus), atol=sentiment.VECTORISED_TOLERANCE)
+
+
+def test_small_parallel_batches_stay_in_process(monkeypatch):
+    def no_pool():
+        raise AssertionError("the worker pool was started")
+
+    monkeypatch.setattr(sentiment, "get_pool", no_pool)
+    monkeypatch.setattr(sentiment, "SENTIMENT_WORKERS", 4)
+    texts = [sentiment.normalise_text(t) for t in COMMENTS]
+    assert sentiment.analyze(texts, parallel=True) == sentiment._score_serial(texts)